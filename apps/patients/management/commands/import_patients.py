@@ -0,0 +1,164 @@
+import csv
+import json
+import time
+from pathlib import Path
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from apps.patients.forms import PatientUserForm, PatientProfileForm
+from apps.patients.models import Patient, PatientIdSequence
+from apps.users.models import User
+from core import stats
+
+
+class ImportUserForm(PatientUserForm):
+    """
+    PatientUserForm for imports: the password is optional (rows without one
+    get an unusable password) and username uniqueness is checked for the whole
+    batch in one query instead of once per row.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['password'].required = False
+
+    def validate_unique(self):
+        pass
+
+
+class ImportProfileForm(PatientProfileForm):
+    class Meta(PatientProfileForm.Meta):
+        fields = [name for name in PatientProfileForm.Meta.fields if name != 'photo']
+
+
+def read_rows(path, fmt):
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            # Line 1 is the header
+            for line, row in enumerate(csv.DictReader(f), start=2):
+                yield line, row
+        else:
+            for line, text in enumerate(f, start=1):
+                if text.strip():
+                    try:
+                        yield line, json.loads(text)
+                    except json.JSONDecodeError as e:
+                        yield line, e
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = 'Imports patients from a CSV or NDJSON file in validated, bulk-inserted batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with header) or NDJSON file.')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per transaction.')
+        parser.add_argument('--errors', help='Write rejected rows and their errors to this CSV file.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if Path(path).suffix.lower() == '.csv' else 'ndjson')
+        if not Path(path).exists():
+            raise CommandError(f'No such file: {path}')
+
+        self.seen_usernames = set()
+        self.errors = []
+        created = 0
+        started = time.monotonic()
+
+        for chunk in chunked(read_rows(path, fmt), options['batch_size']):
+            created += self.import_batch(chunk)
+            elapsed = max(time.monotonic() - started, 1e-9)
+            self.stdout.write(f'{created} imported, {len(self.errors)} rejected ({created / elapsed:,.0f} rows/s)')
+
+        for line, message in self.errors:
+            self.stderr.write(f'line {line}: {message}')
+        if options['errors'] and self.errors:
+            with open(options['errors'], 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['line', 'error'])
+                writer.writerows(self.errors)
+
+        style = self.style.SUCCESS if not self.errors else self.style.WARNING
+        self.stdout.write(style(f'Imported {created} patients, rejected {len(self.errors)} rows.'))
+
+    def validate(self, chunk):
+        """Run the registration form rules over a batch; returns valid (line, user, profile) tuples."""
+        candidates = []
+        for line, row in chunk:
+            if not isinstance(row, dict):
+                self.errors.append((line, f'Invalid row: {row}'))
+                continue
+            row = {key: ('' if value is None else value) for key, value in row.items()}
+            user_form = ImportUserForm(row)
+            profile_form = ImportProfileForm(row)
+            if not (user_form.is_valid() and profile_form.is_valid()):
+                errors = {**user_form.errors, **profile_form.errors}
+                self.errors.append((line, '; '.join(f'{field}: {" ".join(msgs)}' for field, msgs in errors.items())))
+                continue
+            candidates.append((line, user_form, profile_form))
+
+        usernames = [user_form.cleaned_data['username'] for _, user_form, _ in candidates]
+        taken = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        valid = []
+        for line, user_form, profile_form in candidates:
+            username = user_form.cleaned_data['username']
+            if username in taken or username in self.seen_usernames:
+                self.errors.append((line, f'username: A user with username "{username}" already exists.'))
+                continue
+            self.seen_usernames.add(username)
+
+            user = user_form.save(commit=False)
+            password = user_form.cleaned_data.get('password')
+            user.password = make_password(password or None)
+            user.role = User.Role.PATIENT
+            valid.append((line, user, profile_form.save(commit=False)))
+        return valid
+
+    def import_batch(self, chunk):
+        valid = self.validate(chunk)
+        if not valid:
+            return 0
+        patient_ids = PatientIdSequence.allocate_ids(len(valid))
+        for (_, _, profile), patient_id in zip(valid, patient_ids):
+            profile.patient_id = patient_id
+
+        try:
+            with transaction.atomic():
+                users = User.objects.bulk_create([user for _, user, _ in valid])
+                for user, (_, _, profile) in zip(users, valid):
+                    profile.user = user
+                    # bulk_create bypasses Patient.save()
+                    profile.search_text = profile.build_search_text()
+                Patient.objects.bulk_create([profile for _, _, profile in valid])
+        except IntegrityError:
+            # Something raced us (e.g. a username registered meanwhile); fall
+            # back to per-row inserts so only the offending rows are rejected.
+            created = 0
+            for line, user, profile in valid:
+                try:
+                    with transaction.atomic():
+                        user.pk = profile.pk = None
+                        user.save()
+                        profile.user = user
+                        profile.save()
+                    created += 1
+                except IntegrityError as e:
+                    self.errors.append((line, str(e)))
+            return created
+
+        # bulk_create skips the signals that maintain the dashboard counters
+        stats.increment({stats.TOTAL_PATIENTS: len(valid)})
+        return len(valid)
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.patients import uploads
+from apps.patients.models import DocumentBlob, DocumentUpload
+
+
+class Command(BaseCommand):
+    help = 'Deletes chunked document uploads that have not received data for a while, and unused document blobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=24, help='Idle time after which an upload is abandoned.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        stale = list(DocumentUpload.objects.filter(updated_at__lt=cutoff))
+        for upload in stale:
+            uploads.discard_part(upload)
+            upload.delete()
+        self.stdout.write(self.style.SUCCESS(f'{len(stale)} stale uploads removed.'))
+
+        # Blobs whose last PatientDocument was deleted; purge_blob re-checks under a lock
+        unused = DocumentBlob.objects.filter(documents__isnull=True).values_list('pk', flat=True)
+        purged = sum(uploads.purge_blob(sha256) for sha256 in list(unused))
+        self.stdout.write(self.style.SUCCESS(f'{purged} unused document blobs removed.'))
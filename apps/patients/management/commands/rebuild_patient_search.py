@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from apps.patients import search
+from apps.patients.models import Patient
+
+
+class Command(BaseCommand):
+    help = 'Recomputes Patient.search_text and recreates the search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using, batch_size = options['database'], options['batch_size']
+        updated, last_pk = 0, 0
+        while True:
+            batch = list(
+                Patient.objects.using(using).select_related('user')
+                .filter(pk__gt=last_pk).order_by('pk')[:batch_size]
+            )
+            if not batch:
+                break
+            changed = []
+            for patient in batch:
+                text = patient.build_search_text()
+                if text != patient.search_text:
+                    patient.search_text = text
+                    changed.append(patient)
+            with transaction.atomic(using=using):
+                Patient.objects.using(using).bulk_update(changed, ['search_text'])
+            updated += len(changed)
+            last_pk = batch[-1].pk
+        search.install(connections[using], rebuild=True)
+        self.stdout.write(self.style.SUCCESS(f'{updated} patients updated; search index rebuilt.'))
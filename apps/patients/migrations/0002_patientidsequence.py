@@ -0,0 +1,41 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:03
+
+import re
+
+from django.db import migrations, models
+
+PATIENT_ID_RE = re.compile(r'^HMS-(\d{4})-(\d+)$')
+
+
+def seed_sequences(apps, schema_editor):
+    """Start each year's counter after the highest ID already issued."""
+    Patient = apps.get_model('patients', 'Patient')
+    PatientIdSequence = apps.get_model('patients', 'PatientIdSequence')
+
+    last_values = {}
+    for patient_id in Patient.objects.values_list('patient_id', flat=True).iterator():
+        match = PATIENT_ID_RE.match(patient_id or '')
+        if match:
+            year, number = int(match.group(1)), int(match.group(2))
+            last_values[year] = max(last_values.get(year, 0), number)
+    PatientIdSequence.objects.bulk_create(
+        PatientIdSequence(year=year, last_value=value) for year, value in last_values.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientIdSequence',
+            fields=[
+                ('year', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('last_value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:34
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Copies of apps.patients.models.normalize_search_text and of the index SQL
+# in apps.patients.search as of this migration
+FTS_TABLE = 'patients_patient_fts'
+SQLITE_INSTALL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        search_text, content='patients_patient', content_rowid='id', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON patients_patient BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON patients_patient BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF search_text ON patients_patient BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+        INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_UNINSTALL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+POSTGRESQL_INSTALL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    """CREATE INDEX IF NOT EXISTS patient_search_tsv_idx ON patients_patient
+        USING gin (to_tsvector('simple', search_text))""",
+    """CREATE INDEX IF NOT EXISTS patient_search_trgm_idx ON patients_patient
+        USING gin (search_text gin_trgm_ops)""",
+]
+POSTGRESQL_UNINSTALL = [
+    'DROP INDEX IF EXISTS patient_search_tsv_idx',
+    'DROP INDEX IF EXISTS patient_search_trgm_idx',
+]
+
+
+def search_words(value):
+    value = unicodedata.normalize('NFKD', str(value or '')).encode('ascii', 'ignore').decode().lower()
+    return re.findall(r'[a-z0-9]+', value)
+
+
+def normalize_search_text(*values):
+    words = []
+    for value in values:
+        parts = search_words(value)
+        words += parts
+        compacts = [''.join(search_words(token)) for token in str(value or '').split()]
+        compacts.append(''.join(parts))
+        for compact in compacts:
+            if compact and compact not in words:
+                words.append(compact)
+    return ' '.join(words)
+
+
+def run(schema_editor, statements):
+    statements = statements.get(schema_editor.connection.vendor, [])
+    with schema_editor.connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def fill_search_text(apps, schema_editor):
+    Patient = apps.get_model('patients', 'Patient')
+    batch = []
+    for patient in Patient.objects.select_related('user').iterator(chunk_size=2000):
+        user = patient.user
+        patient.search_text = normalize_search_text(
+            user.first_name, user.last_name, user.email, patient.patient_id,
+            patient.phone_number, patient.insurance_policy_number,
+        )
+        batch.append(patient)
+        if len(batch) == 2000:
+            Patient.objects.bulk_update(batch, ['search_text'])
+            batch = []
+    Patient.objects.bulk_update(batch, ['search_text'])
+
+
+def install_search_index(apps, schema_editor):
+    run(schema_editor, {'sqlite': SQLITE_INSTALL, 'postgresql': POSTGRESQL_INSTALL})
+
+
+def uninstall_search_index(apps, schema_editor):
+    run(schema_editor, {'sqlite': SQLITE_UNINSTALL, 'postgresql': POSTGRESQL_UNINSTALL})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0006_document_uploads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='search_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -1,5 +1,7 @@
+import re
+import unicodedata
 import uuid
-from django.db import models
+from django.db import models, transaction, IntegrityError
 from django.conf import settings
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
@@ -20,6 +22,7 @@ class Patient(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='patient_profile')
     patient_id = models.CharField(max_length=100, unique=True, blank=True)
     photo = models.ImageField(_("Profile Photo"), upload_to=patient_photo_upload_path, null=True, blank=True)
+    photo_thumbnails = models.JSONField(default=dict, blank=True)  # {size: path}, see core.images
     phone_number = models.CharField(_("Phone Number"), max_length=20, blank=True)
     address = models.TextField(_("Address"), blank=True)
     date_of_birth = models.DateField(_("Date of Birth"), null=True, blank=True)
@@ -27,27 +30,163 @@ class Patient(models.Model):
     emergency_contact_phone = models.CharField(_("Emergency Contact Phone"), max_length=20, blank=True)
     insurance_provider = models.CharField(_("Insurance Provider"), max_length=100, blank=True)
     insurance_policy_number = models.CharField(_("Insurance Policy Number"), max_length=100, blank=True)
+    # Normalized name, IDs and contact details; indexed by apps.patients.search
+    search_text = models.TextField(blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Newest-first listing and API cursor pagination
+            models.Index(fields=['-created_at', '-id'], name='patient_created_idx'),
+            # Patient list ETag: MAX(updated_at)
+            models.Index(fields=['updated_at'], name='patient_updated_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.patient_id:
             # Generate a unique patient ID, e.g., HMS-2024-XXXXX
-            last_patient = Patient.objects.order_by('id').last()
-            new_id = (last_patient.id + 1) if last_patient else 1
-            year = timezone.now().year
-            self.patient_id = f'HMS-{year}-{new_id:05d}'
+            self.patient_id = PatientIdSequence.allocate_ids(1)[0]
+        self.search_text = self.build_search_text()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'search_text'}
         super().save(*args, **kwargs)
 
+    def build_search_text(self, user=None):
+        """The ``search_text`` value for this profile and ``user`` (default: its own)."""
+        user = user or self.user
+        return normalize_search_text(
+            user.first_name, user.last_name, user.email, self.patient_id,
+            self.phone_number, self.insurance_policy_number,
+        )
+
     def __str__(self):
         return f"{self.user.first_name} {self.user.last_name} ({self.patient_id})"
 
 
+def search_words(value):
+    """Lowercase, accent-free alphanumeric words of ``value``."""
+    value = unicodedata.normalize('NFKD', str(value or '')).encode('ascii', 'ignore').decode().lower()
+    return re.findall(r'[a-z0-9]+', value)
+
+
+def normalize_search_text(*values):
+    """
+    The words of ``values`` separated by single spaces.
+
+    Values with punctuation inside (IDs, phone numbers, emails) are also
+    added with the punctuation removed, per space-separated token and as a
+    whole, so "HMS-2026-00042" is found by "hms202600042" as well as by
+    "00042", and "(555) 010-0100" by "5550100100" and "010-0100".
+    """
+    words = []
+    for value in values:
+        parts = search_words(value)
+        words += parts
+        compacts = [''.join(search_words(token)) for token in str(value or '').split()]
+        compacts.append(''.join(parts))
+        for compact in compacts:
+            if compact and compact not in words:
+                words.append(compact)
+    return ' '.join(words)
+
+
+def format_patient_id(year, number):
+    return f'HMS-{year}-{number:05d}'
+
+
+class PatientIdSequence(models.Model):
+    """
+    Per-year counter backing patient ID allocation.
+
+    Reserving IDs is a single atomic ``UPDATE ... SET last_value = last_value + n``
+    on the year's row, so concurrent registrations never hand out the same
+    number and bulk imports can reserve a whole block at once.
+    """
+    year = models.PositiveIntegerField(primary_key=True)
+    last_value = models.PositiveBigIntegerField(default=0)
+
+    @classmethod
+    def allocate(cls, count=1, year=None):
+        """Reserve ``count`` consecutive numbers for ``year``; returns a range."""
+        if count < 1:
+            raise ValueError('count must be at least 1')
+        year = year or timezone.now().year
+        with transaction.atomic():
+            updated = cls.objects.filter(year=year).update(last_value=models.F('last_value') + count)
+            if not updated:
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(year=year, last_value=count)
+                except IntegrityError:
+                    # Another worker created the row first
+                    cls.objects.filter(year=year).update(last_value=models.F('last_value') + count)
+            # The UPDATE above already holds the row lock until commit
+            last_value = cls.objects.select_for_update().values_list('last_value', flat=True).get(year=year)
+        return range(last_value - count + 1, last_value + 1)
+
+    @classmethod
+    def allocate_ids(cls, count=1, year=None):
+        """Reserve ``count`` formatted patient IDs, e.g. for a bulk import."""
+        year = year or timezone.now().year
+        return [format_patient_id(year, number) for number in cls.allocate(count, year)]
+
+    def __str__(self):
+        return f"{self.year}: {self.last_value}"
+
+
+def document_blob_path(sha256):
+    """Content-addressed storage name for a document blob."""
+    return f'documents/blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
+
+class DocumentBlob(models.Model):
+    """
+    Stored document content, named by its SHA-256, so identical files uploaded
+    for any number of PatientDocuments are stored once.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    size = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def name(self):
+        return document_blob_path(self.sha256)
+
+    def __str__(self):
+        return f"{self.sha256} ({self.size} bytes)"
+
+
 class PatientDocument(models.Model):
     """
     Model to store uploaded documents for a patient.
+
+    Documents uploaded through the resumable upload endpoint point ``document``
+    at their shared DocumentBlob; never delete that file from here.
     """
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='documents')
     document = models.FileField(_("Document"), upload_to=patient_document_upload_path)
+    blob = models.ForeignKey(DocumentBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='documents')
+    filename = models.CharField(_("File Name"), max_length=255, blank=True)
     description = models.CharField(_("Description"), max_length=255, blank=True)
-    uploaded_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    uploaded_at = models.DateTimeField(auto_now_add=True)
+
+
+class DocumentUpload(models.Model):
+    """
+    An in-progress chunked upload (apps.patients.uploads). Chunks are appended
+    to a temporary file until ``received`` reaches ``size``.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='uploads')
+    uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    filename = models.CharField(max_length=255)
+    description = models.CharField(max_length=255, blank=True)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename}: {self.received}/{self.size}"
\ No newline at end of file
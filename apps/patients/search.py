@@ -0,0 +1,161 @@
+"""
+Ranked patient search over ``Patient.search_text``.
+
+Every space-separated query term, with punctuation removed, must match the
+start of a word in the search column, so "jo smi" finds "John Smith",
+"00042" and "hms-2026-00042" find "HMS-2026-00042", and "john.smith@" finds
+the email. The index depends on the database:
+
+* PostgreSQL: a GIN index on ``to_tsvector('simple', search_text)`` for
+  prefix matching and ``ts_rank``, plus a ``pg_trgm`` GIN index so the whole
+  query is also matched as a substring and ranked by similarity.
+* SQLite: an external-content FTS5 table kept in step by triggers, ranked
+  by bm25.
+* Anything else: ``icontains`` filters, newest first.
+
+Results are capped at ``limit``; search is for finding a patient, not for
+paging through thousands of matches. Only the newest RANK_WINDOW matches are
+ranked, so a broad query such as a two-letter prefix costs the same as a
+precise one.
+"""
+from django.db import connections
+
+from .models import Patient, search_words
+
+FTS_TABLE = 'patients_patient_fts'
+MIN_QUERY_LENGTH = 2
+RANK_WINDOW = 2000
+# Shortest substring pg_trgm can answer from its index
+TRIGRAM_MIN_LENGTH = 3
+
+SQLITE_INSTALL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        search_text, content='patients_patient', content_rowid='id', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON patients_patient BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON patients_patient BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF search_text ON patients_patient BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+        INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text);
+    END""",
+]
+SQLITE_OBJECTS = {FTS_TABLE, f'{FTS_TABLE}_insert', f'{FTS_TABLE}_delete', f'{FTS_TABLE}_update'}
+SQLITE_REBUILD = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+SQLITE_UNINSTALL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+POSTGRESQL_INSTALL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    """CREATE INDEX IF NOT EXISTS patient_search_tsv_idx ON patients_patient
+        USING gin (to_tsvector('simple', search_text))""",
+    """CREATE INDEX IF NOT EXISTS patient_search_trgm_idx ON patients_patient
+        USING gin (search_text gin_trgm_ops)""",
+]
+POSTGRESQL_UNINSTALL = [
+    'DROP INDEX IF EXISTS patient_search_tsv_idx',
+    'DROP INDEX IF EXISTS patient_search_trgm_idx',
+]
+
+
+def install(connection, rebuild=False):
+    """
+    Create whatever part of the search index is missing for ``connection``'s
+    database; on SQLite the FTS table is then rebuilt from patients_patient
+    (or always, with ``rebuild``). Runs after every migrate (see core.signals)
+    because on SQLite a migration that rebuilds patients_patient drops the
+    triggers.
+    """
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT name FROM sqlite_master WHERE name IN ({', '.join(['%s'] * len(SQLITE_OBJECTS))})",
+                sorted(SQLITE_OBJECTS),
+            )
+            missing = SQLITE_OBJECTS - {row[0] for row in cursor.fetchall()}
+            if missing or rebuild:
+                for sql in SQLITE_INSTALL + [SQLITE_REBUILD]:
+                    cursor.execute(sql)
+    elif connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            for sql in POSTGRESQL_INSTALL:
+                cursor.execute(sql)
+
+
+def installable(connection):
+    """Whether the database has the search column to index (it is migrated far enough)."""
+    with connection.cursor() as cursor:
+        if 'patients_patient' not in connection.introspection.table_names(cursor):
+            return False
+        columns = connection.introspection.get_table_description(cursor, 'patients_patient')
+    return any(column.name == 'search_text' for column in columns)
+
+
+def uninstall(connection):
+    statements = {'sqlite': SQLITE_UNINSTALL, 'postgresql': POSTGRESQL_UNINSTALL}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def search_terms(query):
+    """Each space-separated token of ``query`` with case, accents and punctuation removed."""
+    return [term for term in (''.join(search_words(token)) for token in query.split()) if term]
+
+
+def ranked_ids(query, limit=20, using='default'):
+    """Primary keys of the best ``limit`` matches for ``query``, best first."""
+    terms = search_terms(query)
+    if len(''.join(terms)) < MIN_QUERY_LENGTH:
+        return []
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        sql = f"""
+            SELECT rowid FROM (
+                SELECT rowid, rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rowid DESC LIMIT %s
+            ) ORDER BY rank, rowid DESC LIMIT %s
+        """
+        # The exact word as well as the prefix, so bm25 ranks "smith" above "smithers"
+        params = [' AND '.join(f'("{term}" OR "{term}"*)' for term in terms), RANK_WINDOW, limit]
+    elif connection.vendor == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        phrase = ' '.join(search_words(query))
+        match = "to_tsvector('simple', search_text) @@ to_tsquery('simple', %s)"
+        params = [tsquery]
+        if len(phrase) >= TRIGRAM_MIN_LENGTH:
+            match += ' OR search_text ILIKE %s'
+            params.append(f'%{phrase}%')
+        sql = f"""
+            SELECT id FROM (
+                SELECT id, search_text FROM patients_patient WHERE {match} ORDER BY id DESC LIMIT %s
+            ) AS matches
+            ORDER BY ts_rank(to_tsvector('simple', search_text), to_tsquery('simple', %s))
+                     + similarity(search_text, %s) DESC, id DESC
+            LIMIT %s
+        """
+        params += [RANK_WINDOW, tsquery, phrase, limit]
+    else:
+        queryset = Patient.objects.using(using)
+        for term in terms:
+            queryset = queryset.filter(search_text__icontains=term)
+        return list(queryset.order_by('-created_at', '-id').values_list('pk', flat=True)[:limit])
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search(query, limit=20, queryset=None):
+    """The best ``limit`` patients for ``query`` as a list, best first."""
+    if queryset is None:
+        queryset = Patient.objects.select_related('user')
+    ids = ranked_ids(query, limit, using=queryset.db)
+    if not ids:
+        return []
+    found = queryset.in_bulk(ids)
+    return [found[pk] for pk in ids if pk in found]
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from core.serializers import SparseFieldsetMixin
 from .models import Patient, PatientDocument
 
 class PatientDocumentSerializer(serializers.ModelSerializer):
@@ -6,8 +7,11 @@ class PatientDocumentSerializer(serializers.ModelSerializer):
         model = PatientDocument
         fields = ['id', 'document', 'description', 'uploaded_at']
 
-class PatientSerializer(serializers.ModelSerializer):
+class PatientSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     documents = PatientDocumentSerializer(many=True, read_only=True)
     class Meta:
         model = Patient
-        fields = '__all__'
\ No newline at end of file
+        # Not search_text or photo_thumbnails: internal, derived columns
+        fields = ['id', 'user', 'patient_id', 'photo', 'phone_number', 'address', 'date_of_birth',
+                  'emergency_contact_name', 'emergency_contact_phone', 'insurance_provider',
+                  'insurance_policy_number', 'created_at', 'updated_at', 'documents']
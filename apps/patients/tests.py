@@ -0,0 +1,277 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from unittest import skipUnless
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.users.models import User
+from . import search, uploads
+from .models import DocumentBlob, DocumentUpload, Patient, PatientDocument, PatientIdSequence, normalize_search_text
+
+
+class PatientIdAllocationTests(TestCase):
+    def create_patient(self, username):
+        user = User.objects.create(username=username, role=User.Role.PATIENT)
+        return Patient.objects.create(user=user)
+
+    def test_save_assigns_sequential_ids(self):
+        year = timezone.now().year
+        first = self.create_patient('alice')
+        second = self.create_patient('bob')
+        self.assertEqual(first.patient_id, f'HMS-{year}-00001')
+        self.assertEqual(second.patient_id, f'HMS-{year}-00002')
+
+    def test_block_allocation_does_not_overlap(self):
+        block = PatientIdSequence.allocate(100, year=2030)
+        self.assertEqual(list(block), list(range(1, 101)))
+        self.assertEqual(list(PatientIdSequence.allocate(2, year=2030)), [101, 102])
+        self.assertEqual(PatientIdSequence.allocate_ids(1, year=2031), ['HMS-2031-00001'])
+
+    def test_existing_patient_id_is_kept(self):
+        patient = Patient(user=User.objects.create(username='carol'), patient_id='HMS-2020-00042')
+        patient.save()
+        self.assertEqual(patient.patient_id, 'HMS-2020-00042')
+        self.assertFalse(PatientIdSequence.objects.exists())
+
+
+class ImportPatientsTests(TestCase):
+    def test_import_creates_valid_rows_and_reports_bad_ones(self):
+        User.objects.create(username='taken')
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write('username,first_name,last_name,email,phone_number,date_of_birth\n')
+            f.write('alice,Alice,Smith,alice@example.com,555-0100,1990-01-02\n')
+            f.write('bob,Bob,Jones,not-an-email,555-0101,\n')
+            f.write('taken,Tom,Taken,tom@example.com,,\n')
+            f.write('carol,Carol,White,carol@example.com,,\n')
+            f.write('carol,Carol,Again,carol2@example.com,,\n')
+        self.addCleanup(os.remove, f.name)
+
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_patients', f.name, '--batch-size', '2', stdout=out, stderr=err)
+
+        self.assertIn('Imported 2 patients, rejected 3 rows.', out.getvalue())
+        self.assertIn('line 3: email', err.getvalue())
+        self.assertIn('line 4: username', err.getvalue())
+        self.assertIn('line 6: username', err.getvalue())
+        alice = Patient.objects.select_related('user').get(user__username='alice')
+        self.assertEqual(alice.user.role, User.Role.PATIENT)
+        self.assertFalse(alice.user.has_usable_password())
+        self.assertEqual(str(alice.date_of_birth), '1990-01-02')
+        self.assertEqual(
+            sorted(Patient.objects.values_list('patient_id', flat=True)),
+            [f'HMS-{timezone.now().year}-00001', f'HMS-{timezone.now().year}-00002'],
+        )
+
+
+class DocumentUploadTests(TestCase):
+    CONTENT = b'%PDF-1.7 ' + bytes(range(256)) * 40
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(
+            MEDIA_ROOT=media_root, DOCUMENT_UPLOAD_DIR=os.path.join(media_root, 'uploads')))
+        self.doctor = User.objects.create_user('house', password='password123', role=User.Role.DOCTOR)
+        self.patient = Patient.objects.create(
+            user=User.objects.create_user('cuddy', password='password123', role=User.Role.PATIENT))
+        self.client.force_login(self.doctor)
+
+    def start(self, content=CONTENT):
+        response = self.client.post(reverse('patients:document-upload-create', args=[self.patient.pk]),
+                                    {'filename': 'scan.pdf', 'size': len(content), 'description': 'MRI'})
+        self.assertEqual(response.status_code, 201)
+        return response.json()['url']
+
+    def put(self, url, offset, chunk):
+        return self.client.put(url, chunk, content_type='application/octet-stream',
+                               headers={'Upload-Offset': str(offset)})
+
+    def upload(self, content=CONTENT, chunk_size=4000):
+        url = self.start(content)
+        for offset in range(0, len(content), chunk_size):
+            response = self.put(url, offset, content[offset:offset + chunk_size])
+        self.assertEqual(response.status_code, 201)
+        return PatientDocument.objects.get(pk=response.json()['document'])
+
+    def test_chunks_are_assembled_into_a_content_addressed_blob(self):
+        document = self.upload()
+        sha256 = hashlib.sha256(self.CONTENT).hexdigest()
+        self.assertEqual(document.blob_id, sha256)
+        self.assertEqual(document.document.name, document.blob.name)
+        self.assertEqual((document.filename, document.description), ('scan.pdf', 'MRI'))
+        with document.document.open('rb') as f:
+            self.assertEqual(f.read(), self.CONTENT)
+        self.assertEqual(os.listdir(os.path.join(os.path.dirname(document.document.path))), [sha256])
+
+    def test_digest_is_recomputed_when_chunks_reach_another_worker(self):
+        url = self.start()
+        self.put(url, 0, self.CONTENT[:5000])
+        uploads._hashers.clear()
+        response = self.put(url, 5000, self.CONTENT[5000:])
+        document = PatientDocument.objects.get(pk=response.json()['document'])
+        self.assertEqual(document.blob_id, hashlib.sha256(self.CONTENT).hexdigest())
+
+    def test_resume_after_offset_mismatch(self):
+        url = self.start()
+        self.put(url, 0, self.CONTENT[:1000])
+        response = self.put(url, 2000, self.CONTENT[2000:3000])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '1000')
+        self.assertEqual(self.client.get(url).json()['offset'], 1000)
+        self.assertEqual(self.put(url, 1000, self.CONTENT[1000:]).status_code, 201)
+
+    def test_retried_chunk_does_not_rewrite_the_part_file(self):
+        url = self.start()
+        upload = DocumentUpload.objects.get()
+        retry = DocumentUpload.objects.get()  # loaded by a request still reading its body
+        uploads.write_chunk(upload, 0, io.BytesIO(self.CONTENT[:1000]), 1000)
+        uploads.write_chunk(upload, 1000, io.BytesIO(self.CONTENT[1000:2000]), 1000)
+        with self.assertRaises(uploads.UploadError) as raised:
+            uploads.write_chunk(retry, 0, io.BytesIO(b'x' * 1000), 1000)
+        self.assertEqual((raised.exception.status, raised.exception.offset), (409, 2000))
+        with open(uploads.part_path(upload), 'rb') as f:
+            self.assertEqual(f.read(), self.CONTENT[:2000])
+        document = self.put(url, 2000, self.CONTENT[2000:]).json()['document']
+        self.assertEqual(PatientDocument.objects.get(pk=document).blob_id, hashlib.sha256(self.CONTENT).hexdigest())
+
+    def test_identical_uploads_share_storage(self):
+        first = self.upload()
+        second = self.upload(chunk_size=len(self.CONTENT))
+        self.assertNotEqual(first.pk, second.pk)
+        self.assertEqual(first.document.name, second.document.name)
+        self.assertEqual(DocumentBlob.objects.count(), 1)
+
+    def test_unused_blobs_are_purged(self):
+        first = self.upload()
+        second = self.upload()
+        path = first.document.path
+        first.delete()
+        call_command('purge_stale_uploads', stdout=io.StringIO())
+        self.assertTrue(os.path.exists(path))
+        second.delete()
+        out = io.StringIO()
+        call_command('purge_stale_uploads', stdout=out)
+        self.assertIn('1 unused document blobs removed.', out.getvalue())
+        self.assertFalse(DocumentBlob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.upload().document.path, path)
+
+    def test_range_download(self):
+        document = self.upload()
+        url = reverse('patients:document-download', args=[document.pk])
+        response = self.client.get(url, headers={'Range': 'bytes=10-19'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.CONTENT)}')
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT[10:20])
+
+        response = self.client.get(url, headers={'Range': 'bytes=-5'})
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT[-5:])
+        response = self.client.get(url, headers={'Range': f'bytes={len(self.CONTENT)}-'})
+        self.assertEqual(response.status_code, 416)
+        response = self.client.get(url, headers={'If-None-Match': f'"{document.blob_id}"'})
+        self.assertEqual(response.status_code, 304)
+
+    def test_other_patients_cannot_download(self):
+        document = self.upload()
+        other = User.objects.create_user('wilson', password='password123', role=User.Role.PATIENT)
+        self.client.force_login(other)
+        response = self.client.get(reverse('patients:document-download', args=[document.pk]))
+        self.assertEqual(response.status_code, 403)
+
+
+class PatientSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='password123', role=User.Role.ADMIN)
+        cls.smith = cls.register('jsmith', 'John', 'Smith', phone_number='(555) 010-0100',
+                                 insurance_policy_number='POL-77-A')
+        cls.smithers = cls.register('wsmithers', 'Waylon', 'Smithers')
+        cls.jonas = cls.register('jjonas', 'Jonas', 'Müller', email='jonas.muller@example.org')
+
+    def setUp(self):
+        cache.clear()
+
+    @staticmethod
+    def register(username, first_name, last_name, email=None, **profile):
+        user = User.objects.create_user(username, password='password123', role=User.Role.PATIENT,
+                                        first_name=first_name, last_name=last_name,
+                                        email=email or f'{username}@example.com')
+        return Patient.objects.create(user=user, **profile)
+
+    def test_normalized_text_keeps_punctuated_values_whole(self):
+        self.assertEqual(
+            normalize_search_text('Zoë', 'HMS-2026-00042'),
+            'zoe hms 2026 00042 hms202600042',
+        )
+
+    def test_matches_word_prefixes_across_fields(self):
+        self.assertEqual(search.search('jo smi'), [self.smith])
+        self.assertEqual(search.search('müller'), [self.jonas])
+        self.assertEqual(search.search('muller'), [self.jonas])
+        self.assertEqual(search.search('5550100100'), [self.smith])
+        self.assertEqual(search.search('010-0100'), [self.smith])
+        self.assertEqual(search.search('pol-77'), [self.smith])
+        self.assertEqual(search.search('jonas.muller@'), [self.jonas])
+        self.assertEqual(search.search(self.smithers.patient_id.lower()), [self.smithers])
+        self.assertEqual(search.search('x'), [])
+
+    def test_exact_word_ranks_above_longer_word(self):
+        self.assertEqual(search.search('smith')[:2], [self.smith, self.smithers])
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS triggers are SQLite only')
+    def test_migrate_restores_dropped_triggers(self):
+        with connection.cursor() as cursor:
+            # What a migration that rebuilds patients_patient leaves behind
+            cursor.execute(f'DROP TRIGGER {search.FTS_TABLE}_update')
+        emit_post_migrate_signal(0, False, DEFAULT_DB_ALIAS, apps=apps, plan=[])
+        self.smith.phone_number = '555 999 0000'
+        self.smith.save()
+        self.assertEqual(search.search('5559990000'), [self.smith])
+
+    def test_index_follows_profile_and_user_changes(self):
+        self.smith.user.last_name = 'Jones'
+        self.smith.user.save()
+        self.assertEqual(search.search('jones'), [self.smith])
+        self.assertEqual(search.search('john smith'), [])
+
+        self.smith.phone_number = '555-9999'
+        self.smith.save(update_fields=['phone_number'])
+        self.assertEqual(search.search('5559999'), [self.smith])
+
+        self.smith.delete()
+        self.assertEqual(search.search('jones'), [])
+
+    def test_rebuild_command_backfills_bulk_inserted_rows(self):
+        Patient.objects.filter(pk=self.jonas.pk).update(search_text='')
+        self.assertEqual(search.search('jonas'), [])
+        call_command('rebuild_patient_search', stdout=io.StringIO())
+        self.assertEqual(search.search('jonas'), [self.jonas])
+
+    def test_list_view_shows_ranked_matches(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('core:patient-list'), {'q': 'smith'})
+        self.assertEqual(list(response.context['patients']), [self.smith, self.smithers])
+        self.assertContains(response, 'value="smith"')
+
+    def test_autocomplete(self):
+        url = reverse('patients:patient-autocomplete')
+        self.client.force_login(self.admin)
+        results = self.client.get(url, {'q': 'smith', 'limit': 1}).json()['results']
+        self.assertEqual(results, [{
+            'id': self.smith.user_id, 'patient_id': self.smith.patient_id,
+            'name': 'John Smith', 'phone': '(555) 010-0100',
+            'label': f'John Smith ({self.smith.patient_id})',
+        }])
+        self.client.force_login(self.jonas.user)
+        self.assertEqual(self.client.get(url, {'q': 'smi'}).status_code, 403)
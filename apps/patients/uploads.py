@@ -0,0 +1,284 @@
+"""
+Chunked, resumable patient document uploads into content-addressed storage.
+
+A client creates a DocumentUpload with the file name and size, then PUTs the
+bytes in order, each request carrying its ``Upload-Offset``. Chunks are read
+from the request stream straight into ``<DOCUMENT_UPLOAD_DIR>/<id>.part``
+(never buffered whole in memory) and fed to a SHA-256 hasher kept by the
+worker process. When a chunk lands in another worker, or after a restart, the
+digest is recomputed from the part file once the upload completes. The
+finished file becomes the DocumentBlob named by its digest, so content that
+is already stored is not stored twice. Requests for one upload are
+serialized on its row, so a worker's hasher always matches the part file.
+Blobs left without documents are deleted by ``purge_stale_uploads``.
+
+Downloads are served with FileResponse and single-range ``Range`` support, or
+handed to the front-end server when DOCUMENT_SENDFILE_HEADER is set (e.g.
+``X-Accel-Redirect`` for nginx).
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+
+from apps.users.models import User
+from .models import DocumentBlob, DocumentUpload, PatientDocument
+
+READ_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# upload id: (offset hashed so far, hasher); only valid for contiguous chunks
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+def can_access(user, patient):
+    """Staff roles see every patient's documents, patients only their own."""
+    return user.role in (User.Role.ADMIN, User.Role.DOCTOR) or patient.user_id == user.pk
+
+
+def part_path(upload):
+    return os.path.join(settings.DOCUMENT_UPLOAD_DIR, f'{upload.pk}.part')
+
+
+def create_upload(patient, user, filename, size, description=''):
+    if not 0 < size <= settings.DOCUMENT_UPLOAD_MAX_SIZE:
+        raise UploadError(f'Size must be between 1 and {settings.DOCUMENT_UPLOAD_MAX_SIZE} bytes.', status=413)
+    filename = os.path.basename(filename.replace('\\', '/'))[:255]
+    if not filename:
+        raise UploadError('A file name is required.')
+    upload = DocumentUpload.objects.create(
+        patient=patient, uploaded_by=user, filename=filename, description=description[:255], size=size)
+    os.makedirs(settings.DOCUMENT_UPLOAD_DIR, exist_ok=True)
+    open(part_path(upload), 'wb').close()
+    return upload
+
+
+def take_hasher(upload_id, offset):
+    with _hashers_lock:
+        entry = _hashers.pop(upload_id, None)
+    if entry and entry[0] == offset:
+        return entry[1]
+    return hashlib.sha256() if offset == 0 else None
+
+
+def keep_hasher(upload_id, offset, hasher):
+    if hasher is not None:
+        with _hashers_lock:
+            _hashers[upload_id] = (offset, hasher)
+
+
+def write_chunk(upload, offset, stream, length):
+    """
+    Append ``length`` bytes read from ``stream`` at ``offset``. Returns the
+    PatientDocument once the last chunk has arrived, otherwise None.
+    """
+    if length > settings.DOCUMENT_UPLOAD_CHUNK_SIZE:
+        raise UploadError(f'Chunks may be at most {settings.DOCUMENT_UPLOAD_CHUNK_SIZE} bytes.', status=413)
+    with transaction.atomic():
+        # The row lock makes the offset check, the write and the new offset
+        # one step: of two requests for the same offset (a client retrying
+        # while the first is still running) the second waits and then gets
+        # a 409 instead of writing the part file at the same time.
+        try:
+            upload.received = DocumentUpload.objects.select_for_update().values_list(
+                'received', flat=True).get(pk=upload.pk)
+        except DocumentUpload.DoesNotExist:
+            raise UploadError('The upload has already completed or was aborted.', status=404)
+        if offset != upload.received:
+            raise UploadError('Upload-Offset does not match the bytes received.', status=409, offset=upload.received)
+        if offset + length > upload.size:
+            raise UploadError('The chunk goes past the declared size.', offset=upload.received)
+
+        hasher = take_hasher(upload.pk, offset)
+        written = 0
+        with open(part_path(upload), 'r+b') as f:
+            f.seek(offset)
+            f.truncate()  # drop whatever a failed earlier attempt left behind
+            while written < length:
+                data = stream.read(min(READ_SIZE, length - written))
+                if not data:
+                    break
+                f.write(data)
+                if hasher is not None:
+                    hasher.update(data)
+                written += len(data)
+            if written != length:
+                f.truncate(offset)
+                raise UploadError('The chunk ended early.', offset=offset)
+
+        received = offset + length
+        DocumentUpload.objects.filter(pk=upload.pk).update(received=received, updated_at=timezone.now())
+        upload.received = received
+        if received < upload.size:
+            keep_hasher(upload.pk, received, hasher)
+            return None
+        # Still under the lock, so the upload completes only once
+        return complete(upload, hasher)
+
+
+def hash_file(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(READ_SIZE), b''):
+            hasher.update(data)
+    return hasher
+
+
+def store_blob(path, name):
+    """Move the finished part file to ``name`` in the default storage."""
+    if default_storage.exists(name):
+        return
+    try:
+        target = default_storage.path(name)
+    except NotImplementedError:
+        # Remote storage: upload a copy
+        with open(path, 'rb') as f:
+            default_storage.save(name, File(f))
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(path, target)
+
+
+def complete(upload, hasher=None):
+    path = part_path(upload)
+    sha256 = (hasher or hash_file(path)).hexdigest()
+    with transaction.atomic():
+        # Locked so purge_blob cannot remove the blob while it gains a document
+        blob, created = DocumentBlob.objects.select_for_update().get_or_create(
+            sha256=sha256, defaults={'size': upload.size})
+        if created:
+            store_blob(path, blob.name)
+        document = PatientDocument.objects.create(
+            patient_id=upload.patient_id,
+            blob=blob,
+            document=blob.name,
+            filename=upload.filename,
+            description=upload.description,
+        )
+        # Through the queryset so ``upload`` keeps its pk for the response
+        DocumentUpload.objects.filter(pk=upload.pk).delete()
+    discard_part(upload)
+    return document
+
+
+def purge_blob(sha256):
+    """
+    Delete the blob ``sha256`` and its file if no PatientDocument uses it
+    any more. Returns whether it was deleted.
+    """
+    with transaction.atomic():
+        blob = DocumentBlob.objects.select_for_update().filter(pk=sha256).first()
+        if blob is None or blob.documents.exists():
+            return False
+        name = blob.name
+        blob.delete()
+        # Before committing: an upload of the same content waits for the
+        # lock above and then stores the file again
+        default_storage.delete(name)
+    return True
+
+
+def discard_part(upload):
+    with _hashers_lock:
+        _hashers.pop(upload.pk, None)
+    try:
+        os.remove(part_path(upload))
+    except FileNotFoundError:
+        pass
+
+
+class RangeFile:
+    """Read at most ``length`` bytes of ``file`` from its current position."""
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """``(start, end)`` inclusive for a single-range header, None to ignore it, or ValueError."""
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def serve(request, document):
+    """Download response for ``document`` with Range, ETag and sendfile support."""
+    field_file = document.document
+    filename = document.filename or os.path.basename(field_file.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    etag = f'"{document.blob_id}"' if document.blob_id else None
+
+    if settings.DOCUMENT_SENDFILE_HEADER:
+        # The front-end server streams the file and handles Range itself
+        response = HttpResponse(content_type=content_type)
+        response[settings.DOCUMENT_SENDFILE_HEADER] = settings.DOCUMENT_SENDFILE_PREFIX + field_file.name
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+        return response
+
+    if etag and request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    size = document.blob.size if document.blob_id else field_file.size
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if range_header and request.headers.get('If-Range', etag) == etag:
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = field_file.storage.open(field_file.name, 'rb')
+    if byte_range:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(RangeFile(file, end - start + 1), status=206, content_type=content_type,
+                                as_attachment=True, filename=filename)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    else:
+        response = FileResponse(file, content_type=content_type, as_attachment=True, filename=filename)
+    response['Accept-Ranges'] = 'bytes'
+    if etag:
+        response['ETag'] = etag
+    return response
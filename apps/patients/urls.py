@@ -5,5 +5,9 @@ app_name = 'patients'
 
 urlpatterns = [
     path('register/', views.patient_register_view, name='patient-register'),
+    path('autocomplete/', views.patient_autocomplete, name='patient-autocomplete'),
+    path('<int:patient_pk>/documents/uploads/', views.document_upload_create, name='document-upload-create'),
+    path('documents/uploads/<uuid:pk>/', views.document_upload, name='document-upload'),
+    path('documents/<int:pk>/download/', views.document_download, name='document-download'),
 ]
 
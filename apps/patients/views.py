@@ -1,26 +1,21 @@
-from django.shortcuts import render, redirect
-from django.views.generic import ListView
+from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.utils.decorators import method_decorator
 from django.views.decorators.cache import never_cache
 from django.db import transaction
 from django.contrib import messages
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_http_methods, require_POST
 
-from .models import Patient
+from . import search, uploads
+from .models import DocumentUpload, Patient, PatientDocument
 from apps.users.models import User
+from core.http import no_store
 from .forms import PatientUserForm, PatientProfileForm
 
-@method_decorator(login_required, name='dispatch')
-@method_decorator(never_cache, name='dispatch')
-class PatientListView(ListView):
-    """View to display a paginated list of patients."""
-    model = Patient
-    template_name = 'patient_list.html'
-    context_object_name = 'patients'
-    paginate_by = 10
-
-    def get_queryset(self):
-        return Patient.objects.select_related('user').order_by('-created_at')
+SEARCH_RESULTS = 50
+AUTOCOMPLETE_RESULTS = 10
 
 @login_required
 @never_cache
@@ -57,3 +52,113 @@ def patient_register_view(request):
 def dashboard(request):
     """View for the dashboard."""
     return render(request, 'dashboard.html')
+
+
+def upload_state(upload, status=200, document=None):
+    response = JsonResponse({
+        'id': str(upload.pk),
+        'url': reverse('patients:document-upload', args=[upload.pk]),
+        'offset': upload.received,
+        'size': upload.size,
+        'chunk_size': settings.DOCUMENT_UPLOAD_CHUNK_SIZE,
+        'document': document.pk if document else None,
+    }, status=status)
+    response['Upload-Offset'] = upload.received
+    return response
+
+
+def upload_error(error):
+    response = JsonResponse({'error': str(error), 'offset': error.offset}, status=error.status)
+    if error.offset is not None:
+        response['Upload-Offset'] = error.offset
+    return response
+
+
+@login_required
+@no_store
+@require_POST
+def document_upload_create(request, patient_pk):
+    """Start a chunked upload: POST ``filename``, ``size`` and optional ``description``."""
+    patient = get_object_or_404(Patient, pk=patient_pk)
+    if not uploads.can_access(request.user, patient):
+        return HttpResponseForbidden()
+    try:
+        size = int(request.POST.get('size', ''))
+    except ValueError:
+        return JsonResponse({'error': 'Pass the file size in bytes as "size".'}, status=400)
+    try:
+        upload = uploads.create_upload(patient, request.user, request.POST.get('filename', ''), size,
+                                       request.POST.get('description', ''))
+    except uploads.UploadError as e:
+        return upload_error(e)
+    return upload_state(upload, status=201)
+
+
+@login_required
+@no_store
+@require_http_methods(['GET', 'HEAD', 'PUT', 'DELETE'])
+def document_upload(request, pk):
+    """
+    GET/HEAD reports how many bytes have been received (to resume), PUT
+    appends the request body at the ``Upload-Offset`` header, DELETE aborts.
+    """
+    upload = get_object_or_404(DocumentUpload, pk=pk, uploaded_by=request.user)
+    if request.method == 'DELETE':
+        uploads.discard_part(upload)
+        upload.delete()
+        return HttpResponse(status=204)
+    if request.method == 'PUT':
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.headers.get('Content-Length', ''))
+        except ValueError:
+            return JsonResponse({'error': 'Upload-Offset and Content-Length headers are required.'}, status=400)
+        try:
+            # Read the body as a stream; request.body would buffer the chunk
+            document = uploads.write_chunk(upload, offset, request, length)
+        except uploads.UploadError as e:
+            return upload_error(e)
+        return upload_state(upload, status=201 if document else 200, document=document)
+    return upload_state(upload)
+
+
+@login_required
+@require_http_methods(['GET', 'HEAD'])
+def document_download(request, pk):
+    """Download a patient document; supports Range and If-None-Match."""
+    document = get_object_or_404(PatientDocument.objects.select_related('patient', 'blob'), pk=pk)
+    if not uploads.can_access(request.user, document.patient):
+        return HttpResponseForbidden()
+    response = uploads.serve(request, document)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@login_required
+@require_http_methods(['GET'])
+def patient_autocomplete(request):
+    """Best matches for ``?q=`` as JSON, for patient pickers such as appointment_create."""
+    if request.user.role not in (User.Role.ADMIN, User.Role.DOCTOR):
+        return HttpResponseForbidden()
+    try:
+        limit = min(int(request.GET.get('limit', AUTOCOMPLETE_RESULTS)), SEARCH_RESULTS)
+    except ValueError:
+        limit = AUTOCOMPLETE_RESULTS
+    patients = search.search(
+        request.GET.get('q', ''), limit=limit,
+        queryset=Patient.objects.select_related('user').only(
+            'user_id', 'patient_id', 'phone_number', 'user__first_name', 'user__last_name'),
+    )
+    response = JsonResponse({'results': [
+        {
+            # Appointments reference the patient by user id
+            'id': patient.user_id,
+            'patient_id': patient.patient_id,
+            'name': f'{patient.user.first_name} {patient.user.last_name}',
+            'phone': patient.phone_number,
+            'label': f'{patient.user.first_name} {patient.user.last_name} ({patient.patient_id})',
+        }
+        for patient in patients
+    ]})
+    response['Cache-Control'] = 'private, max-age=30'
+    return response
@@ -0,0 +1,123 @@
+"""
+Connection handling cost of the DB_POOL_MODE profiles against PostgreSQL.
+
+Each profile runs in a fresh interpreter (settings are read at startup) and
+simulates ``--requests`` requests from ``--threads`` threads: Django's
+request_started/request_finished signals around a small indexed query, which
+is what the connection lifecycle of a real request comes down to. Reports
+throughput, p50/p95 latency, server connections opened, and the
+statement_timeout each connection got.
+
+    python benchmarks/db_profile.py --database-url postgres://localhost/hms_bench
+    python benchmarks/db_profile.py --database-url postgres://localhost:6432/hms_bench --profiles pgbouncer
+
+The database needs the schema (``manage.py migrate``); no rows are required.
+The ``pool`` profile needs ``psycopg[pool]``.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+# name: environment for the run
+PROFILES = {
+    'no-reuse': {'DB_POOL_MODE': 'persistent', 'DB_CONN_MAX_AGE': '0'},
+    'persistent': {'DB_POOL_MODE': 'persistent', 'DB_CONN_MAX_AGE': '600', 'DB_CONN_HEALTH_CHECKS': 'True'},
+    'pool': {'DB_POOL_MODE': 'pool'},
+    'pgbouncer': {'DB_POOL_MODE': 'pgbouncer'},
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', required=True, help='PostgreSQL URL (or a PgBouncer in front of it).')
+    parser.add_argument('--profiles', nargs='+', choices=sorted(PROFILES),
+                        default=['no-reuse', 'persistent', 'pool'])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=500, help='Requests per thread.')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def worker(args):
+    """Runs inside the child process with the profile's environment."""
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hospital_management.settings')
+    import django
+    django.setup()
+    from django.core.signals import request_finished, request_started
+    from django.db import connection
+
+    from apps.users.models import User
+
+    backend_pids = set()
+    timings = []
+    lock = threading.Lock()
+
+    def run():
+        local = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            request_started.send(sender=None)
+            User.objects.filter(pk=1).exists()
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_backend_pid()')
+                pid = cursor.fetchone()[0]
+            request_finished.send(sender=None)
+            local.append(time.perf_counter() - start)
+            with lock:
+                backend_pids.add(pid)
+        with lock:
+            timings.extend(local)
+        connection.close()
+
+    with connection.cursor() as cursor:
+        cursor.execute('SHOW statement_timeout')
+        statement_timeout = cursor.fetchone()[0]
+    connection.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=run) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    print(json.dumps({
+        'rps': len(timings) / elapsed,
+        'p50_ms': timings[len(timings) // 2] * 1000,
+        'p95_ms': timings[int(len(timings) * 0.95) - 1] * 1000,
+        'server_connections': len(backend_pids),
+        'statement_timeout': statement_timeout,
+    }))
+
+
+def main():
+    args = parse_args()
+    if args.worker:
+        return worker(args)
+    print(f'{"profile":<12}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"conns":>7}  statement_timeout')
+    for name in args.profiles:
+        env = {**os.environ, **PROFILES[name], 'DATABASE_URL': args.database_url}
+        env.pop('DATABASE_REPLICA_URL', None)
+        result = subprocess.run(
+            [sys.executable, __file__, '--worker', '--database-url', args.database_url,
+             '--threads', str(args.threads), '--requests', str(args.requests)],
+            env=env, capture_output=True, text=True,
+        )
+        if result.returncode:
+            print(f'{name:<12}failed: {result.stderr.strip().splitlines()[-1]}')
+            continue
+        row = json.loads(result.stdout.strip().splitlines()[-1])
+        print(f'{name:<12}{row["rps"]:>9.0f}{row["p50_ms"]:>9.2f}{row["p95_ms"]:>9.2f}'
+              f'{row["server_connections"]:>7}  {row["statement_timeout"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Render time of the list templates with and without row fragment caching.
+
+Rows are built in memory (no database needed), and each template is rendered
+three ways: with caching disabled (DummyCache, the behaviour before row
+fragments), with an empty cache (first request after a change), and with a
+warm cache (every later request).
+
+    python benchmarks/fragment_cache.py
+    python benchmarks/fragment_cache.py --rows 500 --template appointments
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hospital_management.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.cache import cache  # noqa: E402
+from django.template.loader import render_to_string  # noqa: E402
+from django.test import RequestFactory, override_settings  # noqa: E402
+from django.urls import resolve  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from apps.patients.models import Patient as PatientProfile  # noqa: E402
+from apps.users.models import User  # noqa: E402
+from core.models import Appointment, Doctor, Patient  # noqa: E402
+
+DUMMY_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def make_user(pk, role):
+    return User(pk=pk, username=f'user{pk}', first_name=f'First{pk}', last_name=f'Last{pk}', role=role)
+
+
+def appointment_rows(count):
+    now = timezone.now()
+    doctors = [Doctor(user=make_user(pk, User.Role.DOCTOR), specialization='Cardiology', updated_at=now)
+               for pk in range(1, 51)]
+    rows = []
+    for pk in range(1, count + 1):
+        patient = Patient(user=make_user(1000 + pk, User.Role.PATIENT))
+        rows.append(Appointment(
+            pk=pk, patient=patient, doctor=doctors[pk % len(doctors)], status='scheduled',
+            appointment_datetime=now + timedelta(hours=pk), reason='Follow-up visit', updated_at=now,
+        ))
+    return rows
+
+
+def doctor_rows(count):
+    now = timezone.now()
+    return [Doctor(user=make_user(pk, User.Role.DOCTOR), specialization='Cardiology', updated_at=now)
+            for pk in range(1, count + 1)]
+
+
+def patient_rows(count):
+    now = timezone.now()
+    return [PatientProfile(pk=pk, user=make_user(pk, User.Role.PATIENT), patient_id=f'HMS-2026-{pk:05d}',
+                           phone_number='555-0100', updated_at=now)
+            for pk in range(1, count + 1)]
+
+
+TEMPLATES = {
+    'appointments': ('appointment_list.html', 'appointments', appointment_rows, '/dashboard/appointments/'),
+    'doctors': ('doctor_list.html', 'doctors', doctor_rows, '/dashboard/doctors/'),
+    'patients': ('patient_list.html', 'patients', patient_rows, '/dashboard/patients/list/'),
+}
+
+
+def render(name, rows, request):
+    template, context_name, _, _ = TEMPLATES[name]
+    start = time.perf_counter()
+    render_to_string(template, {context_name: rows}, request=request)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--template', choices=sorted(TEMPLATES), nargs='+', default=sorted(TEMPLATES))
+    parser.add_argument('--repeat', type=int, default=3, help='Best of N for the uncached and warm timings.')
+    args = parser.parse_args()
+
+    admin = make_user(0, User.Role.ADMIN)
+    print(f'{"template":<14}{"rows":>8}{"uncached ms":>14}{"cold ms":>10}{"warm ms":>10}{"speedup":>9}')
+    for name in args.template:
+        path = TEMPLATES[name][3]
+        request = RequestFactory().get(path)
+        request.user = admin
+        request.resolver_match = resolve(path)
+        for count in args.rows:
+            rows = TEMPLATES[name][2](count)
+            with override_settings(CACHES=DUMMY_CACHE):
+                uncached = min(render(name, rows, request) for _ in range(args.repeat))
+            cache.clear()
+            cold = render(name, rows, request)
+            warm = min(render(name, rows, request) for _ in range(args.repeat))
+            print(f'{name:<14}{count:>8}{uncached * 1000:>14.1f}{cold * 1000:>10.1f}'
+                  f'{warm * 1000:>10.1f}{uncached / warm:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
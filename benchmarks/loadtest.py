@@ -0,0 +1,287 @@
+"""
+Load test for the login, dashboard, list and registration flows.
+
+Seeds a scratch database with BulkSeeder, then drives the views either
+in-process through Django's test client (``--mode client``) or over HTTP
+against a threaded WSGI server started by this script (``--mode wsgi``), from
+``--concurrency`` threads or, in wsgi mode, ``--processes`` processes. Prints
+throughput and p50/p95/p99 latency per scenario and writes them as JSON, so
+runs on different commits can be compared with ``--compare``.
+
+    python benchmarks/loadtest.py
+    python benchmarks/loadtest.py --mode wsgi --concurrency 8 --output before.json
+    python benchmarks/loadtest.py --mode wsgi --processes 4 --compare before.json
+    python benchmarks/loadtest.py --database-url postgres://localhost/hms_bench --wipe
+
+Without ``--database-url`` a temporary SQLite file is used. An existing
+database is only reused if it holds no users, unless ``--wipe`` is given.
+"""
+import argparse
+import http.cookiejar
+import json
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PASSWORD = 'password123'
+# name: (role, method, url)
+SCENARIOS = {
+    'login': (None, 'post', '/login/'),
+    'admin-dashboard': ('admin', 'get', '/dashboard/admin/'),
+    'doctor-dashboard': ('doctor', 'get', '/dashboard/doctor/'),
+    'patient-dashboard': ('patient', 'get', '/dashboard/patient/'),
+    'appointment-list': ('admin', 'get', '/dashboard/appointments/'),
+    'patient-list': ('admin', 'get', '/dashboard/patients/list/'),
+    'patient-register': ('admin', 'get', '/patients/register/'),
+    'patient-register-post': ('admin', 'post', '/patients/register/'),
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='dj-database-url style URL of a scratch database.')
+    parser.add_argument('--wipe', action='store_true', help='Delete existing data before seeding.')
+    parser.add_argument('--doctors', type=int, default=50)
+    parser.add_argument('--patients', type=int, default=1000)
+    parser.add_argument('--appointments', type=int, default=20000)
+    parser.add_argument('--mode', choices=['client', 'wsgi'], default='client')
+    parser.add_argument('--concurrency', type=int, default=1, help='Load-generating threads.')
+    parser.add_argument('--processes', type=int, default=0,
+                        help='Load-generating processes instead of threads (wsgi mode only).')
+    parser.add_argument('--requests', type=int, default=50, help='Requests per scenario per worker.')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), nargs='+', default=list(SCENARIOS))
+    parser.add_argument('--output', '-o', help='Write results as JSON to this file.')
+    parser.add_argument('--compare', help='Earlier JSON results to print the change against.')
+    args = parser.parse_args()
+    if args.processes and args.mode != 'wsgi':
+        parser.error('--processes needs --mode wsgi')
+    return args
+
+
+def setup_django(database_url):
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hospital_management.settings')
+    sys.path.insert(0, str(ROOT))
+    import django
+    django.setup()
+
+
+def seed(args):
+    from django.core.management import call_command
+
+    from apps.users.models import User
+    from core import stats
+    from core.seeding import BulkSeeder
+
+    call_command('migrate', verbosity=0)
+    if User.objects.exists() and not args.wipe:
+        sys.exit('The database already has users; pass --wipe to replace them.')
+    seeder = BulkSeeder(progress=lambda message: print(message, file=sys.stderr), seed=1)
+    seeder.wipe()
+    User.objects.filter(username='bench_admin').delete()
+    doctor_pks = seeder.seed_doctors(args.doctors)
+    # PatientListView and the patient dashboard read the registration profile
+    patient_pks = seeder.seed_patients(args.patients, profiles=True)
+    seeder.seed_appointments(args.appointments, patient_pks, doctor_pks)
+    User.objects.create_user('bench_admin', password=PASSWORD, role=User.Role.ADMIN)
+    stats.reconcile()
+    usernames = dict(User.objects.filter(pk__in=[doctor_pks[0], patient_pks[0]]).values_list('pk', 'username'))
+    return {'admin': 'bench_admin', 'doctor': usernames[doctor_pks[0]], 'patient': usernames[patient_pks[0]]}
+
+
+class ClientSession:
+    """In-process requests through django.test.Client."""
+    def __init__(self, base_url=None):
+        from django.test import Client
+        self.client = Client()
+
+    def request(self, method, path, data=None):
+        response = getattr(self.client, method)(path, data or {})
+        return response.status_code
+
+
+class HttpSession:
+    """Real HTTP requests with a cookie jar and Django's CSRF cookie."""
+    class NoRedirect(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), self.NoRedirect)
+
+    def csrf_token(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == 'csrftoken'), '')
+
+    def request(self, method, path, data=None):
+        body, headers = None, {}
+        if method == 'post':
+            body = urllib.parse.urlencode(data or {}).encode()
+            headers['X-CSRFToken'] = self.csrf_token()
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers, method=method.upper())
+        try:
+            with self.opener.open(req) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+
+def login(session, username):
+    # The login page sets the CSRF cookie that the POST must echo back
+    session.request('get', '/login/')
+    return session.request('post', '/login/', {'username': username, 'password': PASSWORD})
+
+
+def run_worker(mode, base_url, users, scenarios, requests, worker_id):
+    """Run every scenario ``requests`` times; returns {scenario: [(seconds, ok)]}."""
+    session_class = HttpSession if mode == 'wsgi' else ClientSession
+    sessions = {}
+    for role, username in users.items():
+        sessions[role] = session_class(base_url)
+        login(sessions[role], username)
+    results = {name: [] for name in scenarios}
+    for i in range(requests):
+        for name in scenarios:
+            role, method, url = SCENARIOS[name]
+            data = None
+            if name == 'login':
+                session = session_class(base_url)
+                session.request('get', '/login/')
+                data = {'username': users['patient'], 'password': PASSWORD}
+            else:
+                session = sessions[role]
+            if name == 'patient-register-post':
+                username = f'bench_{os.getpid()}_{worker_id}_{i}'
+                data = {'username': username, 'first_name': 'Bench', 'last_name': 'Patient',
+                        'email': f'{username}@example.com', 'password': PASSWORD}
+            start = time.perf_counter()
+            status = session.request(method, url, data)
+            # Pages render with 200; successful logins and registrations redirect
+            results[name].append((time.perf_counter() - start, status == (302 if method == 'post' else 200)))
+    return results
+
+
+def process_worker(job):
+    return run_worker(*job)
+
+
+def start_server():
+    from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+    from socketserver import ThreadingMixIn
+
+    from django.core.wsgi import get_wsgi_application
+
+    class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+        daemon_threads = True
+        request_queue_size = 128
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = make_server('127.0.0.1', 0, get_wsgi_application(),
+                         server_class=ThreadingWSGIServer, handler_class=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    timings = sorted(seconds for seconds, _ in samples)
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for _, ok in samples if not ok),
+        'throughput_rps': len(samples) / elapsed if elapsed else None,
+        'mean_ms': statistics.fmean(timings) * 1000 if timings else None,
+        **{f'p{p}_ms': percentile(timings, p) * 1000 for p in (50, 95, 99) if timings},
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    args = parse_args()
+    database_url = args.database_url or f'sqlite:///{tempfile.mkdtemp()}/loadtest.sqlite3'
+    setup_django(database_url)
+    from django.db import connection
+
+    users = seed(args)
+    server, base_url = start_server() if args.mode == 'wsgi' else (None, None)
+    workers = args.processes or args.concurrency
+    jobs = [(args.mode, base_url, users, args.scenario, args.requests, i) for i in range(workers)]
+
+    started = time.perf_counter()
+    if args.processes:
+        with multiprocessing.get_context('spawn').Pool(args.processes) as pool:
+            outcomes = pool.map(process_worker, jobs)
+    else:
+        outcomes = [None] * workers
+        threads = [threading.Thread(target=lambda i=i: outcomes.__setitem__(i, run_worker(*jobs[i])))
+                   for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - started
+    if server:
+        server.shutdown()
+
+    samples = {name: [sample for outcome in outcomes for sample in outcome[name]] for name in args.scenario}
+    results = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'database': connection.vendor,
+        'mode': args.mode,
+        'workers': workers,
+        'worker_type': 'process' if args.processes else 'thread',
+        'data': {'doctors': args.doctors, 'patients': args.patients, 'appointments': args.appointments},
+        # All scenarios share the run, so per-scenario throughput is its share of it
+        'elapsed_seconds': elapsed,
+        'throughput_rps': sum(len(rows) for rows in samples.values()) / elapsed,
+        'scenarios': {name: summarize(samples[name], elapsed) for name in args.scenario},
+    }
+    baseline = json.loads(Path(args.compare).read_text())['scenarios'] if args.compare else {}
+
+    print(f'{"scenario":<24}{"reqs":>7}{"errors":>7}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}'
+          + (f'{"p95 vs base":>13}' if baseline else ''))
+    for name, row in results['scenarios'].items():
+        line = (f'{name:<24}{row["requests"]:>7}{row["errors"]:>7}{row["throughput_rps"]:>9.1f}'
+                f'{row["p50_ms"]:>9.1f}{row["p95_ms"]:>9.1f}{row["p99_ms"]:>9.1f}')
+        before = baseline.get(name, {}).get('p95_ms')
+        if before:
+            line += f'{(row["p95_ms"] - before) / before:>+12.0%} '
+        print(line)
+    print(f'{results["throughput_rps"]:.1f} requests/s overall from {workers} {results["worker_type"]}(s) '
+          f'in {elapsed:.1f}s')
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Latency of ranked patient search (apps.patients.search) against a large table.
+
+Seeds a scratch database with ``--patients`` patients and their registration
+profiles, then runs typical staff queries (name prefixes, full names,
+patient ID fragments, phone numbers, emails) through ``search.ranked_ids``
+and, for comparison, through the unindexed ``icontains`` scan it replaces.
+
+    python benchmarks/patient_search.py
+    python benchmarks/patient_search.py --patients 1000000 --skip-scan
+    python benchmarks/patient_search.py --database-url postgres://localhost/hms_bench --wipe
+
+Without ``--database-url`` a temporary SQLite file is used; pass the same
+file again with ``--reuse`` to skip seeding.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='dj-database-url style URL of a scratch database.')
+    parser.add_argument('--wipe', action='store_true', help='Delete existing data before seeding.')
+    parser.add_argument('--reuse', action='store_true', help='Search the existing data without seeding.')
+    parser.add_argument('--patients', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--skip-scan', action='store_true', help='Do not time the icontains baseline.')
+    return parser.parse_args()
+
+
+def setup_django(database_url):
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hospital_management.settings')
+    sys.path.insert(0, str(ROOT))
+    import django
+    django.setup()
+
+
+def seed(args):
+    from django.core.management import call_command
+
+    from apps.users.models import User
+    from core.seeding import BulkSeeder
+
+    call_command('migrate', verbosity=0)
+    if args.reuse:
+        return
+    if User.objects.exists() and not args.wipe:
+        sys.exit('The database already has users; pass --wipe to replace them or --reuse to keep them.')
+    seeder = BulkSeeder(batch_size=5000, progress=lambda message: print(message, file=sys.stderr), seed=1)
+    seeder.wipe()
+    seeder.seed_patients(args.patients, profiles=True)
+
+
+def sample_queries(count):
+    """Realistic queries built from random existing patients."""
+    from apps.patients.models import Patient
+
+    rng = random.Random(1)
+    last_pk = Patient.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    queries = []
+    while len(queries) < count and last_pk:
+        patient = Patient.objects.select_related('user').filter(pk__gte=rng.randint(1, last_pk)).first()
+        if patient is None:
+            continue
+        user = patient.user
+        queries.append(rng.choice([
+            user.last_name[:3],
+            f'{user.first_name} {user.last_name}',
+            f'{user.first_name[:2]} {user.last_name[:4]}',
+            patient.patient_id.rsplit('-', 1)[-1],
+            patient.patient_id,
+            patient.phone_number,
+            user.email.split('@')[0],
+        ]))
+    return queries
+
+
+def scan_ids(query, limit):
+    from apps.patients.models import Patient
+    from apps.patients.search import search_terms
+
+    queryset = Patient.objects.all()
+    for term in search_terms(query):
+        queryset = queryset.filter(search_text__icontains=term)
+    return list(queryset.order_by('-created_at', '-id').values_list('pk', flat=True)[:limit])
+
+
+def timed(function, queries, limit):
+    timings, hits = [], 0
+    for query in queries:
+        start = time.perf_counter()
+        ids = function(query, limit)
+        timings.append((time.perf_counter() - start) * 1000)
+        hits += bool(ids)
+    timings.sort()
+    return {
+        'p50': statistics.median(timings),
+        'p95': timings[int(len(timings) * 0.95) - 1],
+        'max': timings[-1],
+        'hits': hits,
+    }
+
+
+def main():
+    args = parse_args()
+    database_url = args.database_url or f'sqlite:///{tempfile.mkdtemp()}/search.sqlite3'
+    setup_django(database_url)
+    from django.db import connection
+
+    from apps.patients import search
+    from apps.patients.models import Patient
+
+    seed(args)
+    queries = sample_queries(args.queries)
+    print(f'{Patient.objects.count():,} patients on {connection.vendor}, {len(queries)} queries')
+    print(f'{"method":<14}{"p50 ms":>9}{"p95 ms":>9}{"max ms":>9}{"hits":>7}')
+    methods = [('ranked index', search.ranked_ids)]
+    if not args.skip_scan:
+        methods.append(('icontains', scan_ids))
+    for name, function in methods:
+        row = timed(function, queries, args.limit)
+        print(f'{name:<14}{row["p50"]:>9.1f}{row["p95"]:>9.1f}{row["max"]:>9.1f}{row["hits"]:>7}')
+
+
+if __name__ == '__main__':
+    main()
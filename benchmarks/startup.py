@@ -0,0 +1,173 @@
+"""
+Gunicorn boot time and per-worker memory, old command line vs gunicorn.conf.py.
+
+Starts gunicorn once per profile against a scratch SQLite database and
+reports:
+
+* boot: seconds from launch until every worker has loaded the app;
+* RSS: resident memory of each worker, averaged, after ``--requests``
+  warm-up requests. It counts pages shared with the master too;
+* USS: memory private to each worker, averaged. This is what each extra
+  worker really costs;
+* PSS: the whole server, master included, with shared pages divided among
+  the processes that share them.
+
+Before the profiles it also times importing the WSGI application in a
+fresh interpreter, which is what each worker pays at boot without
+preloading.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --workers 8 --profiles before preload-off after
+
+Linux only (reads /proc/<pid>/smaps_rollup); gunicorn must be installed.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+# name: (config file, extra environment)
+PROFILES = {
+    # The Procfile before gunicorn.conf.py: sync workers, no preload
+    'before': (None, {}),
+    'preload-off': (ROOT / 'gunicorn.conf.py', {'GUNICORN_PRELOAD': 'False'}),
+    'after': (ROOT / 'gunicorn.conf.py', {}),
+}
+# Appended to each profile's config: reports workers as they finish loading the app
+READY_HOOK = '''
+import os as _os
+
+
+def post_worker_init(worker):
+    with open({ready_file!r}, 'a') as ready:
+        ready.write(f'{{_os.getpid()}}\\n')
+'''
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', nargs='+', choices=list(PROFILES), default=['before', 'after'])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=200, help='Warm-up requests before measuring memory.')
+    parser.add_argument('--timeout', type=float, default=60, help='Seconds to wait for the workers to boot.')
+    return parser.parse_args()
+
+
+def import_time(env, repeat=3):
+    code = (
+        'import time; start = time.perf_counter(); '
+        'import hospital_management.wsgi; print(time.perf_counter() - start)'
+    )
+    timings = [
+        float(subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, check=True,
+                             capture_output=True, text=True).stdout)
+        for _ in range(repeat)
+    ]
+    return statistics.median(timings)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def memory(pid):
+    """Rss, Pss and private (USS) memory of ``pid`` in MB."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as rollup:
+        for line in rollup:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return values['Rss'], values['Pss'], values['Private_Clean'] + values['Private_Dirty']
+
+
+def warm_up(port, count):
+    for _ in range(count):
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/login/', timeout=10) as response:
+                response.read()
+        except urllib.error.URLError:
+            pass
+
+
+def run_profile(name, args, env, workdir):
+    config, extra_env = PROFILES[name]
+    ready_file = workdir / f'{name}.ready'
+    config_file = workdir / f'{name}.conf.py'
+    config_file.write_text((config.read_text() if config else '') + READY_HOOK.format(ready_file=str(ready_file)))
+    ready_file.write_text('')
+    port = free_port()
+    command = [
+        sys.executable, '-m', 'gunicorn', 'hospital_management.wsgi',
+        '--config', str(config_file), '--bind', f'127.0.0.1:{port}', '--workers', str(args.workers),
+    ]
+
+    started = time.perf_counter()
+    server = subprocess.Popen(command, cwd=ROOT, env={**env, **extra_env},
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    try:
+        while True:
+            worker_pids = [int(line) for line in ready_file.read_text().split()]
+            if len(worker_pids) >= args.workers:
+                break
+            if server.poll() is not None:
+                raise RuntimeError(f'gunicorn exited: {server.stderr.read().strip().splitlines()[-1:]}')
+            if time.perf_counter() - started > args.timeout:
+                raise RuntimeError(f'only {len(worker_pids)} of {args.workers} workers booted')
+            time.sleep(0.01)
+        boot = time.perf_counter() - started
+
+        warm_up(port, args.requests)
+        # Workers recycled by max_requests during warm-up are not in the list any more
+        worker_pids = [pid for pid in worker_pids if os.path.exists(f'/proc/{pid}')]
+        workers = [memory(pid) for pid in worker_pids]
+        total_pss = memory(server.pid)[1] + sum(pss for _, pss, _ in workers)
+        return {
+            'boot': boot,
+            'rss': statistics.mean(rss for rss, _, _ in workers),
+            'uss': statistics.mean(uss for _, _, uss in workers),
+            'pss': total_pss,
+        }
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    args = parse_args()
+    workdir = Path(tempfile.mkdtemp())
+    env = {
+        **os.environ,
+        'DATABASE_URL': f'sqlite:///{workdir}/startup.sqlite3',
+        'DJANGO_SETTINGS_MODULE': 'hospital_management.settings',
+        'WEB_CONCURRENCY': str(args.workers),
+        # Keep warm-up requests from recycling workers before they are measured
+        'GUNICORN_MAX_REQUESTS': str(args.requests * 10),
+    }
+    env.pop('DATABASE_REPLICA_URL', None)
+    subprocess.run([sys.executable, 'manage.py', 'migrate', '--verbosity', '0'], cwd=ROOT, env=env, check=True)
+
+    print(f'import hospital_management.wsgi: {import_time(env):.2f} s per process')
+    print(f'{args.workers} workers, {args.requests} warm-up requests')
+    print(f'{"profile":<13}{"boot s":>8}{"RSS MB":>9}{"USS MB":>9}{"total PSS MB":>14}')
+    for name in args.profiles:
+        try:
+            row = run_profile(name, args, env, workdir)
+        except RuntimeError as error:
+            print(f'{name:<13}failed: {error}')
+            continue
+        print(f'{name:<13}{row["boot"]:>8.2f}{row["rss"]:>9.1f}{row["uss"]:>9.1f}{row["pss"]:>14.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,9 @@ set -e
 echo "Running migrations..."
 python3 manage.py migrate --noinput
 
+echo "Purging expired sessions..."
+python3 manage.py purge_sessions
+
 echo "Collecting static files..."
 python3 manage.py collectstatic --noinput
 
@@ -0,0 +1,78 @@
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import conditional_page
+from rest_framework import permissions, viewsets
+from rest_framework.pagination import CursorPagination
+
+from apps.patients.models import Patient
+from apps.patients.serializers import PatientSerializer
+from apps.users.models import User
+from core.forms import AppointmentFilterForm
+from core.models import Doctor, Appointment
+from core.serializers import DoctorSerializer, AppointmentSerializer, requested_fields
+
+
+class IsAdminRole(permissions.BasePermission):
+    """Only admin-role (or staff) users may read the API."""
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and (user.is_staff or user.role == User.Role.ADMIN))
+
+
+class ApiCursorPagination(CursorPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class PatientPagination(ApiCursorPagination):
+    ordering = ('-created_at', '-id')
+
+
+class DoctorPagination(ApiCursorPagination):
+    ordering = ('user_id',)
+
+
+class AppointmentPagination(ApiCursorPagination):
+    ordering = ('-appointment_datetime', '-id')
+
+
+# conditional_page adds an ETag to every GET response and turns a matching
+# If-None-Match into a 304, so unchanged pages cost no transfer.
+@method_decorator(conditional_page, name='dispatch')
+class ReadOnlyApiViewSet(viewsets.ReadOnlyModelViewSet):
+    permission_classes = [IsAdminRole]
+
+    def wants(self, field):
+        fields = requested_fields(self.request)
+        return fields is None or field in fields
+
+
+class PatientViewSet(ReadOnlyApiViewSet):
+    serializer_class = PatientSerializer
+    pagination_class = PatientPagination
+
+    def get_queryset(self):
+        queryset = Patient.objects.select_related('user')
+        if self.wants('documents'):
+            queryset = queryset.prefetch_related('documents')
+        return queryset
+
+
+class DoctorViewSet(ReadOnlyApiViewSet):
+    serializer_class = DoctorSerializer
+    pagination_class = DoctorPagination
+
+    def get_queryset(self):
+        return Doctor.objects.select_related('user')
+
+
+class AppointmentViewSet(ReadOnlyApiViewSet):
+    serializer_class = AppointmentSerializer
+    pagination_class = AppointmentPagination
+
+    def get_queryset(self):
+        queryset = Appointment.objects.select_related('patient__user', 'doctor__user')
+        if self.action == 'list':
+            # ?status=, ?doctor=, ?patient=, ?date_from=, ?date_to=
+            queryset = AppointmentFilterForm(self.request.query_params).filter(queryset)
+        return queryset
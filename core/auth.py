@@ -0,0 +1,137 @@
+"""
+Cached user loading for authenticated requests.
+
+CachedAuthenticationMiddleware replaces Django's AuthenticationMiddleware.
+The authenticated user's fields, together with its role profile (Doctor or
+Patient), are kept in the cache under the user's id, so a request that
+carries a valid session resolves ``request.user`` and the dashboard profile
+without touching the users or profile tables. The password hash is not
+cached: the entry holds the session auth hash to check the session against,
+and ``password`` is a deferred field on the cached user, loaded if something
+reads it.
+
+Entries are dropped by core.signals whenever the user or a profile is saved
+or deleted. Writes that skip signals (QuerySet.update, raw SQL) are not seen,
+so a deactivated user, a new role or a password changed that way takes
+effect after at most AUTH_USER_CACHE_TIMEOUT seconds; keep it short. The
+timeout also bounds staleness when the cache is per-process.
+"""
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+from apps.patients.models import Patient
+from apps.users.models import User
+from core.models import Doctor
+
+DASHBOARDS = {
+    User.Role.ADMIN: 'core:admin-dashboard',
+    User.Role.DOCTOR: 'core:doctor-dashboard',
+    User.Role.PATIENT: 'core:patient-dashboard',
+}
+
+_MISSING = object()
+# Every column but the password hash, in model order for User.from_db
+CACHED_USER_FIELDS = [field.attname for field in User._meta.concrete_fields if field.name != 'password']
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def invalidate_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def invalidate_users(user_ids):
+    cache.delete_many([user_cache_key(user_id) for user_id in user_ids])
+
+
+def cache_entry(user):
+    return {
+        'fields': [getattr(user, name) for name in CACHED_USER_FIELDS],
+        'session_hash': user.get_session_auth_hash(),
+        'profile': user.cached_profile,
+    }
+
+
+def user_from_entry(entry):
+    # Users are always read from the primary (core.routers)
+    user = User.from_db(DEFAULT_DB_ALIAS, CACHED_USER_FIELDS, entry['fields'])
+    user.cached_profile = entry['profile']
+    return user
+
+
+def dashboard_url_name(user):
+    """URL name of the role dashboard for ``user``, or None for unknown roles."""
+    return DASHBOARDS.get(str(user.role))
+
+
+def load_profile(user):
+    """The Doctor or Patient row for ``user``'s role, or None."""
+    if user.role == User.Role.DOCTOR:
+        return Doctor.objects.filter(user=user).first()
+    if user.role == User.Role.PATIENT:
+        return Patient.objects.filter(user=user).first()
+    return None
+
+
+def get_profile(user):
+    """``user``'s role profile, using the copy cached with the user if present."""
+    profile = getattr(user, 'cached_profile', _MISSING)
+    if profile is _MISSING:
+        profile = user.cached_profile = load_profile(user)
+    return profile
+
+
+def get_cached_user(request):
+    session = request.session
+    try:
+        user_id = User._meta.pk.to_python(session[SESSION_KEY])
+        backend_path = session[BACKEND_SESSION_KEY]
+    except (KeyError, ValueError):
+        return auth.get_user(request)
+
+    entry = cache.get(user_cache_key(user_id)) if backend_path in settings.AUTHENTICATION_BACKENDS else None
+    if entry is not None:
+        session_hash = session.get(HASH_SESSION_KEY)
+        if session_hash and constant_time_compare(session_hash, entry['session_hash']):
+            user = user_from_entry(entry)
+            user.backend = backend_path
+            return user
+
+    # Cache miss or stale entry: let Django verify (and flush) the session.
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        user.cached_profile = load_profile(user)
+        cache.set(user_cache_key(user.pk), cache_entry(user), settings.AUTH_USER_CACHE_TIMEOUT)
+    return user
+
+
+def get_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = get_cached_user(request)
+    return request._cached_user
+
+
+async def auser(request):
+    if not hasattr(request, '_acached_user'):
+        # Through get_user, so request.user (in templates rendered by async
+        # views) reuses the result instead of loading it in the event loop
+        request._acached_user = await sync_to_async(get_user)(request)
+    return request._acached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
+        request.auser = partial(auser, request)
@@ -0,0 +1,214 @@
+"""
+Appointment booking against Doctor.availability.
+
+Availability is stored as ``{'Monday': ['09:00-12:00', '14:00-17:00'], ...}``
+in the doctor's local time zone. It is parsed into sorted, merged
+``(start_minute, end_minute)`` intervals per weekday, and every appointment
+occupies APPOINTMENT_DURATION from its start time.
+"""
+import bisect
+import logging
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from core.models import Patient, Doctor, Appointment, AvailabilityWindow
+
+APPOINTMENT_DURATION = timedelta(minutes=30)
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+class SlotUnavailable(Exception):
+    """The requested time cannot be booked."""
+
+
+def parse_minutes(value):
+    hours, minutes = value.strip().split(':')
+    hours, minutes = int(hours), int(minutes)
+    if not (0 <= hours <= 24 and 0 <= minutes < 60) or hours * 60 + minutes > 24 * 60:
+        raise ValueError(f'Invalid time {value!r}')
+    return hours * 60 + minutes
+
+
+def parse_availability(availability):
+    """
+    Turn the availability JSON into ``{weekday: [(start_minute, end_minute)]}``
+    with Monday as 0. Raises ValueError for malformed entries.
+    """
+    intervals = {}
+    for day, ranges in (availability or {}).items():
+        try:
+            weekday = WEEKDAYS.index(day.strip().capitalize())
+        except ValueError:
+            raise ValueError(f'Unknown weekday {day!r}') from None
+        if isinstance(ranges, str):
+            ranges = [ranges]
+        for value in ranges:
+            try:
+                start, end = (parse_minutes(part) for part in value.split('-'))
+            except (AttributeError, ValueError):
+                raise ValueError(f'Invalid time range {value!r} for {day}') from None
+            if start >= end:
+                raise ValueError(f'Empty time range {value!r} for {day}')
+            intervals.setdefault(weekday, []).append((start, end))
+
+    merged = {}
+    for weekday, spans in intervals.items():
+        spans.sort()
+        result = [spans[0]]
+        for start, end in spans[1:]:
+            if start <= result[-1][1]:
+                result[-1] = (result[-1][0], max(result[-1][1], end))
+            else:
+                result.append((start, end))
+        merged[weekday] = result
+    return merged
+
+
+def availability_windows(doctor):
+    """Unsaved AvailabilityWindow rows for ``doctor``'s current availability."""
+    return [
+        AvailabilityWindow(doctor=doctor, weekday=weekday, start_minute=start, end_minute=end)
+        for weekday, spans in parse_availability(doctor.availability).items()
+        for start, end in spans
+    ]
+
+
+def sync_availability_windows(doctor):
+    """
+    Replace the stored AvailabilityWindow rows for ``doctor``. Availability
+    that does not parse (saved without Doctor.clean) is logged and leaves the
+    doctor with no bookable windows until it is corrected.
+    """
+    try:
+        windows = availability_windows(doctor)
+    except (ValueError, AttributeError) as error:
+        logger.warning('Doctor %s has invalid availability, not bookable: %s', doctor.pk, error)
+        windows = []
+    with transaction.atomic():
+        AvailabilityWindow.objects.filter(doctor=doctor).delete()
+        AvailabilityWindow.objects.bulk_create(windows)
+
+
+def available_doctors(at, specialization=None, duration=APPOINTMENT_DURATION):
+    """
+    Doctors whose availability covers ``[at, at + duration)`` and who have no
+    overlapping scheduled appointment, in one query.
+    """
+    local = timezone.localtime(at)
+    minute = local.hour * 60 + local.minute
+    busy = overlapping(Appointment.objects.filter(doctor=OuterRef('pk')), at, duration)
+    doctors = Doctor.objects.filter(
+        availability_windows__weekday=local.weekday(),
+        availability_windows__start_minute__lte=minute,
+        availability_windows__end_minute__gte=minute + duration.total_seconds() // 60,
+    ).exclude(Exists(busy))
+    if specialization:
+        doctors = doctors.filter(specialization=specialization)
+    return doctors.select_related('user').order_by('user__last_name', 'user__first_name')
+
+
+def is_available(intervals, start, duration=APPOINTMENT_DURATION):
+    """Whether ``[start, start + duration)`` lies inside one availability interval."""
+    local = timezone.localtime(start)
+    begin = local.hour * 60 + local.minute
+    end = begin + duration.total_seconds() / 60
+    return any(s <= begin and end <= e for s, e in intervals.get(local.weekday(), ()))
+
+
+def overlapping(queryset, start, duration=APPOINTMENT_DURATION):
+    """Scheduled appointments in ``queryset`` that overlap ``[start, start + duration)``."""
+    return queryset.filter(
+        status='scheduled',
+        appointment_datetime__gt=start - duration,
+        appointment_datetime__lt=start + duration,
+    )
+
+
+def appointment_patient(user):
+    """
+    The core.Patient row appointments reference for the patient ``user``.
+    Patients registered through apps.patients only get their registration
+    profile, so the row is created on their first booking.
+    """
+    return Patient.objects.get_or_create(user=user)[0]
+
+
+def book_appointment(patient, doctor, start, reason='', duration=APPOINTMENT_DURATION):
+    """
+    Book ``start`` for ``patient`` with ``doctor``, or raise SlotUnavailable.
+
+    The patient row and then the doctor row are locked for the duration of
+    the check-and-insert, so concurrent bookings for the same doctor, or for
+    the same patient with different doctors, are serialized and cannot both
+    succeed. Always lock in that order to avoid deadlocks.
+    """
+    if start <= timezone.now():
+        raise SlotUnavailable('Appointments must be booked in the future.')
+    with transaction.atomic():
+        patient = Patient.objects.select_for_update().get(pk=patient.pk)
+        doctor = Doctor.objects.select_for_update().get(pk=doctor.pk)
+        if not is_available(parse_availability(doctor.availability), start, duration):
+            raise SlotUnavailable('The doctor is not available at that time.')
+        if overlapping(Appointment.objects.filter(doctor=doctor), start, duration).exists():
+            raise SlotUnavailable('The doctor already has an appointment at that time.')
+        if overlapping(Appointment.objects.filter(patient=patient), start, duration).exists():
+            raise SlotUnavailable('The patient already has an appointment at that time.')
+        return Appointment.objects.create(
+            patient=patient,
+            doctor=doctor,
+            appointment_datetime=start,
+            reason=reason,
+        )
+
+
+def next_free_slots(doctor, count=5, after=None, duration=APPOINTMENT_DURATION, horizon_days=90, window_days=7):
+    """
+    The next ``count`` bookable start times for ``doctor`` after ``after``.
+
+    Candidate slots are laid out on a ``duration`` grid inside each
+    availability interval. Booked times are fetched one window at a time with
+    a single range query on the doctor/datetime index, so the cost depends on
+    the window scanned, not on the doctor's total number of appointments.
+    """
+    intervals = parse_availability(doctor.availability)
+    if not intervals:
+        return []
+    after = after or timezone.now()
+    step = int(duration.total_seconds() // 60)
+    tz = timezone.get_current_timezone()
+    day = timezone.localtime(after).date()
+    last_day = day + timedelta(days=horizon_days)
+    slots = []
+
+    while day < last_day and len(slots) < count:
+        window_end = min(day + timedelta(days=window_days), last_day)
+        range_start = timezone.make_aware(datetime.combine(day, time.min), tz)
+        range_end = timezone.make_aware(datetime.combine(window_end, time.min), tz)
+        booked = sorted(Appointment.objects.filter(
+            doctor=doctor,
+            status='scheduled',
+            appointment_datetime__gt=range_start - duration,
+            appointment_datetime__lt=range_end,
+        ).values_list('appointment_datetime', flat=True))
+
+        while day < window_end and len(slots) < count:
+            for start_minute, end_minute in intervals.get(day.weekday(), ()):
+                for minute in range(start_minute, end_minute - step + 1, step):
+                    start = timezone.make_aware(
+                        datetime.combine(day, time.min) + timedelta(minutes=minute), tz)
+                    if start <= after:
+                        continue
+                    # Any booking starting within one duration of ``start`` overlaps it
+                    i = bisect.bisect_right(booked, start - duration)
+                    if i < len(booked) and booked[i] < start + duration:
+                        continue
+                    slots.append(start)
+                    if len(slots) == count:
+                        return slots
+            day += timedelta(days=1)
+    return slots
@@ -0,0 +1,9 @@
+from django.conf import settings
+
+
+def fragment_cache(request):
+    """Timeout and version for the ``{% cache %}`` row fragments in list templates."""
+    return {
+        'FRAGMENT_CACHE_TIMEOUT': settings.FRAGMENT_CACHE_TIMEOUT,
+        'FRAGMENT_CACHE_VERSION': settings.HTTP_CACHE_VERSION,
+    }
@@ -0,0 +1,96 @@
+"""
+Streaming exports of appointments and patients.
+
+Rows are read with ``QuerySet.values_list().iterator(chunk_size=...)`` and
+encoded one at a time, so memory use stays flat and the first bytes can be
+sent before the query has finished, regardless of the number of rows.
+"""
+import csv
+import json
+
+from apps.patients.models import Patient
+from core.models import Appointment
+
+CHUNK_SIZE = 2000
+
+APPOINTMENT_COLUMNS = [
+    ('id', 'id'),
+    ('appointment_datetime', 'appointment_datetime'),
+    ('status', 'status'),
+    ('reason', 'reason'),
+    ('patient_id', 'patient_id'),
+    ('patient_first_name', 'patient__user__first_name'),
+    ('patient_last_name', 'patient__user__last_name'),
+    ('doctor_id', 'doctor_id'),
+    ('doctor_first_name', 'doctor__user__first_name'),
+    ('doctor_last_name', 'doctor__user__last_name'),
+    ('doctor_specialization', 'doctor__specialization'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+]
+
+PATIENT_COLUMNS = [
+    ('id', 'id'),
+    ('patient_id', 'patient_id'),
+    ('username', 'user__username'),
+    ('first_name', 'user__first_name'),
+    ('last_name', 'user__last_name'),
+    ('email', 'user__email'),
+    ('phone_number', 'phone_number'),
+    ('address', 'address'),
+    ('date_of_birth', 'date_of_birth'),
+    ('emergency_contact_name', 'emergency_contact_name'),
+    ('emergency_contact_phone', 'emergency_contact_phone'),
+    ('insurance_provider', 'insurance_provider'),
+    ('insurance_policy_number', 'insurance_policy_number'),
+    ('created_at', 'created_at'),
+]
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """File-like object whose write() returns the value instead of buffering it."""
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, columns, chunk_size=CHUNK_SIZE):
+    """Yield value tuples for ``columns`` from ``queryset`` without caching."""
+    return queryset.order_by('pk').values_list(
+        *(lookup for _, lookup in columns)
+    ).iterator(chunk_size=chunk_size)
+
+
+def encode_csv(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow([name for name, _ in columns])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def encode_ndjson(columns, rows):
+    names = [name for name, _ in columns]
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), default=str) + '\n'
+
+
+def encode(fmt, columns, rows):
+    if fmt == 'csv':
+        return encode_csv(columns, rows)
+    if fmt == 'ndjson':
+        return encode_ndjson(columns, rows)
+    raise ValueError(f'Unsupported export format {fmt!r}')
+
+
+def export_appointments(fmt='csv', queryset=None, chunk_size=CHUNK_SIZE):
+    queryset = Appointment.objects.all() if queryset is None else queryset
+    return encode(fmt, APPOINTMENT_COLUMNS, export_rows(queryset, APPOINTMENT_COLUMNS, chunk_size))
+
+
+def export_patients(fmt='csv', queryset=None, chunk_size=CHUNK_SIZE):
+    queryset = Patient.objects.all() if queryset is None else queryset
+    return encode(fmt, PATIENT_COLUMNS, export_rows(queryset, PATIENT_COLUMNS, chunk_size))
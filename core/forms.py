@@ -0,0 +1,51 @@
+from datetime import datetime
+
+from django import forms
+from django.utils import timezone
+
+from apps.users.models import User
+from .models import Doctor, Appointment
+
+
+class AppointmentFilterForm(forms.Form):
+    """Server-side filters for the appointment list."""
+    status = forms.ChoiceField(
+        choices=(('', 'All Status'),) + Appointment.STATUS_CHOICES,
+        required=False,
+    )
+    doctor = forms.IntegerField(required=False, min_value=1)
+    patient = forms.IntegerField(required=False, min_value=1)
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def filter(self, queryset):
+        """Apply the cleaned filters to an Appointment queryset."""
+        if not self.is_valid():
+            return queryset
+        data = self.cleaned_data
+        if data['status']:
+            queryset = queryset.filter(status=data['status'])
+        if data['doctor']:
+            queryset = queryset.filter(doctor_id=data['doctor'])
+        if data['patient']:
+            queryset = queryset.filter(patient_id=data['patient'])
+        return queryset.in_date_range(data['date_from'], data['date_to'])
+
+
+class AppointmentForm(forms.Form):
+    """Booking form for appointment_create; the slot itself is checked by core.booking."""
+    # Patients by user id, as the patient picker returns them; see booking.appointment_patient
+    patient = forms.ModelChoiceField(queryset=User.objects.filter(role=User.Role.PATIENT))
+    doctor = forms.ModelChoiceField(queryset=Doctor.objects.all())
+    date = forms.DateField()
+    time = forms.TimeField()
+    reason = forms.CharField(required=False, widget=forms.Textarea)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('date') and cleaned_data.get('time'):
+            start = timezone.make_aware(datetime.combine(cleaned_data['date'], cleaned_data['time']))
+            if start <= timezone.now():
+                raise forms.ValidationError('Please choose a time in the future.')
+            cleaned_data['appointment_datetime'] = start
+        return cleaned_data
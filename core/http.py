@@ -0,0 +1,112 @@
+"""
+HTTP caching policies for views.
+
+``no_store`` is for pages that must never be kept by the browser (dashboards
+with live data, forms, logout). ``private_conditional`` is for pages that may
+be stored privately but must be revalidated on every use: the view sends
+``Cache-Control: private, no-cache`` with ``Vary: Cookie`` and an ETag (or
+Last-Modified), and a matching conditional GET is answered with 304 before the
+view runs. Because every reuse is revalidated, a browser that goes back to the
+page after logout gets the login redirect instead of the stored copy, which
+is the guarantee never_cache was providing.
+
+Both decorators accept async views as well.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db.models import Max
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import condition
+
+from core import stats
+
+
+def make_etag(*parts):
+    return hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def user_etag(request, *args, **kwargs):
+    """ETag for pages that only depend on the logged-in user and the deployed templates."""
+    user = request.user
+    return make_etag(
+        settings.HTTP_CACHE_VERSION, user.pk, user.role, user.first_name, user.last_name,
+        user.email, user.last_login,
+    )
+
+
+def list_etag(model, *counter_keys):
+    """
+    ETag function for a page listing ``model`` rows. It changes when a row is
+    saved (MAX(updated_at)), added or removed (the ``counter_keys`` totals from
+    core.stats), or when the query string or the user changes.
+    """
+    def etag_func(request, *args, **kwargs):
+        updated = model._default_manager.aggregate(updated=Max('updated_at'))['updated']
+        return make_etag(user_etag(request), request.GET.urlencode(), updated, *stats.read(*counter_keys))
+    return etag_func
+
+
+def no_store(view_func):
+    """never_cache plus the HTTP/1.0 Pragma header."""
+    view_func = never_cache(view_func)
+
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            response = await view_func(request, *args, **kwargs)
+            response['Pragma'] = 'no-cache'
+            return response
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = view_func(request, *args, **kwargs)
+        response['Pragma'] = 'no-cache'
+        return response
+    return wrapper
+
+
+def private_conditional(etag_func=user_etag, last_modified_func=None):
+    """Per-user revalidated caching; see the module docstring."""
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            return async_private_conditional(view_func, etag_func, last_modified_func)
+
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Cookie'])
+            return response
+        return wrapper
+    return decorator
+
+
+def async_private_conditional(view_func, etag_func, last_modified_func):
+    """
+    private_conditional for async views. condition() calls the validator
+    functions directly, and they query the database, which is not allowed in
+    the event loop; they run in a thread first and condition() gets their
+    results.
+    """
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        etag = await sync_to_async(etag_func)(request, *args, **kwargs) if etag_func else None
+        last_modified = (
+            await sync_to_async(last_modified_func)(request, *args, **kwargs) if last_modified_func else None
+        )
+        conditional_view = condition(
+            etag_func=etag_func and (lambda *args, **kwargs: etag),
+            last_modified_func=last_modified_func and (lambda *args, **kwargs: last_modified),
+        )(view_func)
+        response = await conditional_view(request, *args, **kwargs)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Cookie'])
+        return response
+    return wrapper
@@ -0,0 +1,141 @@
+"""
+Profile photo processing.
+
+Saving a Patient or Doctor with a new photo only queues an ImageJob (see
+core.signals); ``manage.py process_image_jobs`` later validates the upload,
+re-encodes it without EXIF metadata (after applying the EXIF orientation) and
+writes WebP thumbnails in THUMBNAIL_SIZES next to it. Thumbnail paths are
+recorded in the model's ``<field>_thumbnails`` JSON field, keyed by size.
+"""
+import io
+import os
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from core import auth
+from core.models import ImageJob
+
+THUMBNAIL_SIZES = (64, 128, 256)
+THUMBNAIL_QUALITY = 80
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF'}
+# Model label: image fields processed by the pipeline
+IMAGE_FIELDS = {
+    'patients.patient': ('photo',),
+    'core.patient': ('profile_picture',),
+    'core.doctor': ('profile_picture',),
+}
+
+
+class InvalidImage(Exception):
+    """The upload is not an image the pipeline accepts."""
+
+
+def image_fields(model):
+    return IMAGE_FIELDS.get(model._meta.label_lower, ())
+
+
+def enqueue(instance, field_name):
+    """Queue processing of ``instance.<field_name>`` once the transaction commits."""
+    job = ImageJob(
+        content_type=ContentType.objects.get_for_model(instance),
+        object_id=instance.pk,
+        field_name=field_name,
+    )
+    transaction.on_commit(job.save)
+
+
+def thumbnail_url(instance, size):
+    """URL of the smallest thumbnail of at least ``size`` px, or None if there is none yet."""
+    for field_name in image_fields(type(instance)):
+        thumbnails = getattr(instance, f'{field_name}_thumbnails') or {}
+        sizes = sorted(int(s) for s in thumbnails)
+        if sizes:
+            best = next((s for s in sizes if s >= size), sizes[-1])
+            return getattr(instance, field_name).storage.url(thumbnails[str(best)])
+    return None
+
+
+def open_image(field_file):
+    try:
+        with field_file.open('rb') as f:
+            data = f.read()
+        with Image.open(io.BytesIO(data)) as probe:
+            probe.verify()
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as e:
+        raise InvalidImage(f'{field_file.name}: {e}') from None
+    if image.format not in ALLOWED_FORMATS:
+        raise InvalidImage(f'{field_file.name}: unsupported format {image.format}')
+    return image
+
+
+def strip_metadata(image):
+    """A copy of ``image`` rotated upright, with EXIF and other metadata dropped."""
+    clean = ImageOps.exif_transpose(image)
+    # Encoders take EXIF, XMP and ICC data from ``info``
+    clean.info = {key: value for key, value in clean.info.items() if key == 'transparency'}
+    return clean
+
+
+def encode(image, fmt, **options):
+    buffer = io.BytesIO()
+    if fmt == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    image.save(buffer, fmt, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def process(instance, field_name):
+    """
+    Strip metadata from ``instance.<field_name>`` and build its thumbnails.
+    Returns the thumbnails, or None if the field changed while processing.
+    """
+    field_file = getattr(instance, field_name)
+    storage = field_file.storage
+    image = open_image(field_file)
+    fmt = image.format
+    clean = strip_metadata(image)
+
+    # Written under new names (storages never overwrite); the original is
+    # only deleted once the row points at the copy
+    original = field_file.name
+    name = storage.save(original, encode(clean, fmt))
+    written = [name]
+    stem = os.path.splitext(name)[0]
+    thumbnails = {}
+    for size in THUMBNAIL_SIZES:
+        thumb = clean.copy()
+        thumb.thumbnail((size, size))
+        thumbnails[str(size)] = storage.save(f'{stem}_{size}.webp', encode(thumb, 'WEBP', quality=THUMBNAIL_QUALITY))
+        written.append(thumbnails[str(size)])
+
+    # QuerySet.update: no signals, so this does not queue another job. Only
+    # if the row still has the photo processed here; a newer upload has its
+    # own job.
+    updated = type(instance)._default_manager.filter(pk=instance.pk, **{field_name: original}).update(
+        **{field_name: name, f'{field_name}_thumbnails': thumbnails})
+    if not updated:
+        for path in written:
+            storage.delete(path)
+        return None
+    storage.delete(original)
+    for path in (getattr(instance, f'{field_name}_thumbnails') or {}).values():
+        storage.delete(path)
+    return thumbnails
+
+
+def run_job(job):
+    """Process one claimed job. Returns False if its row or photo has gone away."""
+    model = apps.get_model(job.content_type.app_label, job.content_type.model)
+    instance = model._default_manager.filter(pk=job.object_id).first()
+    if instance is None or not getattr(instance, job.field_name):
+        return False
+    process(instance, job.field_name)
+    # The profile is cached with the user; pick up the new thumbnails
+    auth.invalidate_user(instance.user_id)
+    return True
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from core import exports
+
+
+class Command(BaseCommand):
+    help = 'Streams appointments (or patients) as CSV or NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(exports.FORMATS), default='csv')
+        parser.add_argument('--output', '-o', default='-', help='Output file, "-" for stdout.')
+        parser.add_argument('--patients', action='store_true', help='Export patients instead of appointments.')
+        parser.add_argument('--chunk-size', type=int, default=exports.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        export = exports.export_patients if options['patients'] else exports.export_appointments
+        chunks = export(options['format'], chunk_size=options['chunk_size'])
+        if options['output'] == '-':
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+        else:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(chunks)
+            self.stderr.write(self.style.SUCCESS(f"Export written to {options['output']}."))
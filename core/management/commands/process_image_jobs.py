@@ -0,0 +1,71 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core import images
+from core.models import ImageJob
+
+
+class Command(BaseCommand):
+    help = 'Processes queued profile photos: strips EXIF and builds WebP thumbnails'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty.')
+        parser.add_argument('--batch-size', type=int, default=10, help='Jobs claimed per poll.')
+        parser.add_argument('--poll-interval', type=float, default=5, help='Seconds to sleep when idle.')
+        parser.add_argument('--max-attempts', type=int, default=3, help='Attempts before a job is failed.')
+        parser.add_argument('--stale-after', type=int, default=600,
+                            help='Seconds after which a running job is assumed lost and re-queued.')
+
+    def handle(self, *args, **options):
+        while True:
+            self.requeue_stale(options['stale_after'])
+            jobs = self.claim(options['batch_size'])
+            for job in jobs:
+                self.run(job, options['max_attempts'])
+            if not jobs:
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+
+    def requeue_stale(self, seconds):
+        cutoff = timezone.now() - timedelta(seconds=seconds)
+        ImageJob.objects.filter(status=ImageJob.RUNNING, updated_at__lt=cutoff).update(
+            status=ImageJob.PENDING, updated_at=timezone.now())
+
+    def claim(self, batch_size):
+        """Mark up to ``batch_size`` of the oldest pending jobs as ours."""
+        with transaction.atomic():
+            candidates = list(
+                ImageJob.objects.select_for_update(skip_locked=True)
+                .filter(status=ImageJob.PENDING).order_by('created_at')[:batch_size]
+            )
+            claimed = []
+            for job in candidates:
+                # Conditional so that two workers can never run the same job,
+                # also on databases without SELECT ... FOR UPDATE SKIP LOCKED
+                if ImageJob.objects.filter(pk=job.pk, status=ImageJob.PENDING).update(
+                        status=ImageJob.RUNNING, attempts=F('attempts') + 1, updated_at=timezone.now()):
+                    job.attempts += 1
+                    claimed.append(job)
+        return claimed
+
+    def run(self, job, max_attempts):
+        try:
+            processed = images.run_job(job)
+        except images.InvalidImage as e:
+            status, error = ImageJob.FAILED, str(e)
+        except Exception as e:
+            status = ImageJob.FAILED if job.attempts >= max_attempts else ImageJob.PENDING
+            error = f'{type(e).__name__}: {e}'
+        else:
+            status, error = ImageJob.DONE, '' if processed else 'Photo no longer exists.'
+        ImageJob.objects.filter(pk=job.pk).update(status=status, error=error, updated_at=timezone.now())
+        message = f'{job.content_type.model} {job.object_id}.{job.field_name}: {status}'
+        if error:
+            message += f' ({error})'
+        self.stdout.write(self.style.SUCCESS(message) if status == ImageJob.DONE else self.style.WARNING(message))
@@ -0,0 +1,34 @@
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = ('Deletes expired rows from django_session in small batches, so that no '
+            'statement holds locks for long (unlike clearsessions\' single DELETE)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows deleted per statement.')
+        parser.add_argument('--pause', type=float, default=0.05,
+                            help='Seconds to sleep between batches, to leave room for other writers.')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        deleted = 0
+        while True:
+            # Keys first, through the expire_date index, then a delete by primary key
+            keys = list(
+                Session.objects.filter(expire_date__lt=now)
+                .order_by('expire_date').values_list('session_key', flat=True)[:options['batch_size']]
+            )
+            if not keys:
+                break
+            with transaction.atomic():
+                deleted += Session.objects.filter(session_key__in=keys, expire_date__lt=now).delete()[0]
+            if len(keys) < options['batch_size']:
+                break
+            time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(f'{deleted} expired sessions deleted.'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core import stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the dashboard statistics counters from the source tables'
+
+    def handle(self, *args, **options):
+        drift = stats.reconcile()
+        for key, (old, new) in sorted(drift.items()):
+            self.stdout.write(f'{key}: {old} -> {new}')
+        if drift:
+            self.stdout.write(self.style.WARNING(f'{len(drift)} counters corrected.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('All counters were up to date.'))
@@ -1,89 +1,50 @@
-import random
+import time
+
 from django.core.management.base import BaseCommand
-from django.contrib.auth.hashers import make_password
-from faker import Faker
 from apps.users.models import User
-from core.models import Patient, Doctor, Appointment
+from core import stats
+from core.seeding import BulkSeeder
+
 
 class Command(BaseCommand):
     help = 'Seeds the database with dummy data'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--doctors', type=int, default=5, help='Number of doctors to create.')
+        parser.add_argument('--patients', type=int, default=20, help='Number of patients to create.')
+        parser.add_argument('--appointments', type=int, default=20, help='Number of appointments to create.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert.')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible data.')
+
     def handle(self, *args, **options):
         self.stdout.write('Seeding data...')
-        
-        # Clean up old data
-        User.objects.exclude(is_superuser=True).delete()
-        Patient.objects.all().delete()
-        Doctor.objects.all().delete()
-        Appointment.objects.all().delete()
+        started = time.monotonic()
+        seeder = BulkSeeder(
+            batch_size=options['batch_size'],
+            progress=self.stdout.write,
+            seed=options['seed'],
+        )
 
-        fake = Faker()
+        # Clean up old data
+        seeder.wipe()
 
         # Create Superuser if not exists
         if not User.objects.filter(username='admin').exists():
-            User.objects.create_superuser('admin', 'admin@hms.com', 'admin123')
+            User.objects.create_superuser('admin', 'admin@hms.com', 'admin123', role=User.Role.ADMIN)
             self.stdout.write(self.style.SUCCESS('Admin user created.'))
 
-        # Create Doctors
-        specializations = ['Cardiology', 'Neurology', 'Pediatrics', 'Orthopedics', 'Dermatology']
-        doctors = []
-        for spec in specializations:
-            first_name = fake.first_name()
-            last_name = fake.last_name()
-            username = f"dr_{first_name.lower()}"
-            if User.objects.filter(username=username).exists():
-                username = f"{username}{random.randint(1,1000)}"
-
-            user = User.objects.create(
-                username=username,
-                first_name=first_name,
-                last_name=last_name,
-                email=f"{username}@hms.com",
-                password=make_password('password123'),
-                role='doctor'
-            )
-            doctor = Doctor.objects.create(
-                user=user,
-                specialization=spec,
-                license_number=fake.unique.ean(length=13)
-            )
-            doctors.append(doctor)
-        self.stdout.write(self.style.SUCCESS(f'{len(doctors)} doctors created.'))
+        doctor_pks = seeder.seed_doctors(options['doctors'])
+        self.stdout.write(self.style.SUCCESS(f'{len(doctor_pks)} doctors created.'))
 
-        # Create Patients
-        patients = []
-        for _ in range(20):
-            first_name = fake.first_name()
-            last_name = fake.last_name()
-            username = f"patient_{first_name.lower()}_{last_name.lower()}"
-            if User.objects.filter(username=username).exists():
-                username = f"{username}{random.randint(1,1000)}"
+        patient_pks = seeder.seed_patients(options['patients'])
+        self.stdout.write(self.style.SUCCESS(f'{len(patient_pks)} patients created.'))
 
-            user = User.objects.create(
-                username=username,
-                first_name=first_name,
-                last_name=last_name,
-                email=f"{username}@patient.com",
-                password=make_password('password123'),
-                role='patient'
-            )
-            patient = Patient.objects.create(
-                user=user,
-                address=fake.address(),
-                phone_number=fake.phone_number()
-            )
-            patients.append(patient)
-        self.stdout.write(self.style.SUCCESS(f'{len(patients)} patients created.'))
+        seeder.seed_appointments(options['appointments'], patient_pks, doctor_pks)
+        self.stdout.write(self.style.SUCCESS(f"{options['appointments']} appointments created."))
 
-        # Create Appointments
-        for patient in patients:
-            doctor = random.choice(doctors)
-            Appointment.objects.create(
-                patient=patient,
-                doctor=doctor,
-                appointment_datetime=fake.date_time_this_year(after_now=True),
-                reason=fake.sentence(nb_words=6)
-            )
-        self.stdout.write(self.style.SUCCESS(f'{len(patients)} appointments created.'))
+        # Bulk inserts bypass the signals that maintain the dashboard counters
+        stats.reconcile()
 
-        self.stdout.write(self.style.SUCCESS('Data seeding complete.'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Data seeding complete in {time.monotonic() - started:.1f}s.'
+        ))
@@ -0,0 +1,184 @@
+"""
+In-process request metrics.
+
+core.middleware.PerformanceMiddleware records one RequestSample per request
+into the module-level ``registry``. Each view gets fixed-bucket histograms for
+wall time, DB query count, DB time, template render time and response size;
+percentiles are interpolated from the buckets, so memory use does not grow
+with traffic. The registry lives in the worker process: under gunicorn every
+worker reports its own numbers, labelled with its pid.
+"""
+import bisect
+import contextvars
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger('core.performance')
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+BYTES_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# name: (buckets, Prometheus metric name, help text)
+METRICS = {
+    'duration': (SECONDS_BUCKETS, 'hms_request_duration_seconds', 'Wall time spent in the view and middleware.'),
+    'db_queries': (QUERY_BUCKETS, 'hms_request_db_queries', 'Database queries executed per request.'),
+    'db_time': (SECONDS_BUCKETS, 'hms_request_db_time_seconds', 'Time spent executing database queries.'),
+    'template_time': (SECONDS_BUCKETS, 'hms_request_template_time_seconds', 'Time spent rendering templates.'),
+    'response_size': (BYTES_BUCKETS, 'hms_response_size_bytes', 'Size of non-streaming response bodies.'),
+}
+
+PERCENTILES = (50, 95, 99)
+
+_current_sample = contextvars.ContextVar('performance_sample', default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # counts[i] is observations <= buckets[i]; the last slot is +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, p):
+        """Estimate the ``p``th percentile by interpolating inside its bucket."""
+        if not self.count:
+            return None
+        rank = self.count * p / 100
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i else 0
+                if i == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+    def summary(self):
+        result = {'count': self.count, 'sum': self.sum, 'mean': self.sum / self.count if self.count else None}
+        result.update({f'p{p}': self.percentile(p) for p in PERCENTILES})
+        return result
+
+
+class ViewStats:
+    def __init__(self):
+        self.histograms = {name: Histogram(buckets) for name, (buckets, _, _) in METRICS.items()}
+        self.statuses = {}
+
+    def add(self, sample):
+        for name, histogram in self.histograms.items():
+            value = getattr(sample, name)
+            if value is not None:
+                histogram.observe(value)
+        status = f'{sample.status // 100}xx'
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def record(self, view, sample):
+        with self.lock:
+            self.views.setdefault(view, ViewStats()).add(sample)
+
+    def reset(self):
+        with self.lock:
+            self.views = {}
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'pid': os.getpid(),
+                'views': {
+                    view: {
+                        'statuses': dict(stats.statuses),
+                        **{name: histogram.summary() for name, histogram in stats.histograms.items()},
+                    }
+                    for view, stats in sorted(self.views.items())
+                },
+            }
+
+    def prometheus(self):
+        """The registry in the Prometheus text exposition format (version 0.0.4)."""
+        pid = os.getpid()
+        lines = []
+        with self.lock:
+            views = sorted(self.views.items())
+            lines += [
+                '# HELP hms_requests_total Requests handled, by view and status class.',
+                '# TYPE hms_requests_total counter',
+            ]
+            for view, stats in views:
+                for status, n in sorted(stats.statuses.items()):
+                    lines.append(f'hms_requests_total{{view="{view}",status="{status}",pid="{pid}"}} {n}')
+            for name, (buckets, metric, help_text) in METRICS.items():
+                lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} histogram']
+                for view, stats in views:
+                    histogram = stats.histograms[name]
+                    labels = f'view="{view}",pid="{pid}"'
+                    cumulative = 0
+                    for bound, n in zip(buckets + ('+Inf',), histogram.counts):
+                        cumulative += n
+                        lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_sum{{{labels}}} {histogram.sum}')
+                    lines.append(f'{metric}_count{{{labels}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class RequestSample:
+    """Measurements for one request; also the DB execute wrapper for it."""
+    def __init__(self, path):
+        self.path = path
+        self.started = time.perf_counter()
+        self.duration = None
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.response_size = None
+        self.status = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.db_queries += 1
+            self.db_time += elapsed
+            if elapsed * 1000 >= settings.PERFORMANCE_SLOW_QUERY_MS:
+                logger.warning('Slow query (%.1f ms) on %s: %s', elapsed * 1000, self.path, sql)
+
+    def finish(self, response):
+        self.duration = time.perf_counter() - self.started
+        self.status = response.status_code
+        if not response.streaming:
+            self.response_size = len(response.content)
+
+
+def current_sample():
+    return _current_sample.get()
+
+
+def start_sample(path):
+    sample = RequestSample(path)
+    return sample, _current_sample.set(sample)
+
+
+def end_sample(token):
+    _current_sample.reset(token)
@@ -0,0 +1,38 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from core import metrics
+
+
+class PerformanceMiddleware:
+    """
+    Record per-view wall time, DB queries and DB time, template render time
+    and response size in core.metrics. Enabled by PERFORMANCE_METRICS; place
+    it first in MIDDLEWARE so the other middleware is included in the timings.
+
+    Queries run while a StreamingHttpResponse is consumed happen after the
+    middleware returns and are not counted. The middleware is synchronous:
+    under ASGI, Django runs it (and, through it, the async views) in a
+    thread, so leave it off there except while profiling.
+    """
+    def __init__(self, get_response):
+        if not settings.PERFORMANCE_METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sample, token = metrics.start_sample(request.path)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(sample))
+                response = self.get_response(request)
+        finally:
+            metrics.end_sample(token)
+        sample.finish(response)
+        match = request.resolver_match
+        metrics.registry.record(match.view_name if match else '<unresolved>', sample)
+        return response
@@ -0,0 +1,47 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:02
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def populate_counters(apps, schema_editor):
+    Patient = apps.get_model('patients', 'Patient')
+    Doctor = apps.get_model('core', 'Doctor')
+    Appointment = apps.get_model('core', 'Appointment')
+    StatCounter = apps.get_model('core', 'StatCounter')
+
+    counts = {
+        'patients:total': Patient.objects.count(),
+        'doctors:total': Doctor.objects.count(),
+        'appointments:total': Appointment.objects.count(),
+    }
+    for row in Appointment.objects.values('status').annotate(n=Count('pk')).order_by():
+        counts[f"appointments:status:{row['status']}"] = row['n']
+    by_day = Appointment.objects.annotate(
+        day=TruncDate('appointment_datetime')
+    ).values('day').annotate(n=Count('pk')).order_by()
+    for row in by_day:
+        counts[f"appointments:day:{row['day'].isoformat()}"] = row['n']
+    StatCounter.objects.bulk_create(
+        StatCounter(key=key, value=value) for key, value in counts.items() if value
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_appointment_indexes'),
+        ('patients', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatCounter',
+            fields=[
+                ('key', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
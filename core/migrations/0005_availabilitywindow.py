@@ -0,0 +1,98 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Copy of core.booking.parse_availability as of this migration
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def parse_minutes(value):
+    hours, minutes = value.strip().split(':')
+    hours, minutes = int(hours), int(minutes)
+    if not (0 <= hours <= 24 and 0 <= minutes < 60) or hours * 60 + minutes > 24 * 60:
+        raise ValueError(f'Invalid time {value!r}')
+    return hours * 60 + minutes
+
+
+def parse_availability(availability):
+    intervals = {}
+    for day, ranges in (availability or {}).items():
+        try:
+            weekday = WEEKDAYS.index(day.strip().capitalize())
+        except ValueError:
+            raise ValueError(f'Unknown weekday {day!r}') from None
+        if isinstance(ranges, str):
+            ranges = [ranges]
+        for value in ranges:
+            try:
+                start, end = (parse_minutes(part) for part in value.split('-'))
+            except (AttributeError, ValueError):
+                raise ValueError(f'Invalid time range {value!r} for {day}') from None
+            if start >= end:
+                raise ValueError(f'Empty time range {value!r} for {day}')
+            intervals.setdefault(weekday, []).append((start, end))
+
+    merged = {}
+    for weekday, spans in intervals.items():
+        spans.sort()
+        result = [spans[0]]
+        for start, end in spans[1:]:
+            if start <= result[-1][1]:
+                result[-1] = (result[-1][0], max(result[-1][1], end))
+            else:
+                result.append((start, end))
+        merged[weekday] = result
+    return merged
+
+
+def build_windows(apps, schema_editor):
+    Doctor = apps.get_model('core', 'Doctor')
+    AvailabilityWindow = apps.get_model('core', 'AvailabilityWindow')
+    windows = []
+    for doctor in Doctor.objects.only('pk', 'availability').iterator():
+        try:
+            intervals = parse_availability(doctor.availability)
+        except (ValueError, AttributeError):
+            continue
+        windows.extend(
+            AvailabilityWindow(doctor_id=doctor.pk, weekday=weekday, start_minute=start, end_minute=end)
+            for weekday, spans in intervals.items()
+            for start, end in spans
+        )
+    AvailabilityWindow.objects.bulk_create(windows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_statcounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvailabilityWindow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField()),
+                ('start_minute', models.PositiveSmallIntegerField()),
+                ('end_minute', models.PositiveSmallIntegerField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(fields=['specialization'], name='doctor_specialization_idx'),
+        ),
+        migrations.AddField(
+            model_name='availabilitywindow',
+            name='doctor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability_windows', to='core.doctor'),
+        ),
+        migrations.AddIndex(
+            model_name='availabilitywindow',
+            index=models.Index(fields=['weekday', 'start_minute', 'end_minute'], name='availability_lookup_idx'),
+        ),
+        migrations.RunPython(build_windows, migrations.RunPython.noop),
+    ]
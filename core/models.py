@@ -1,9 +1,16 @@
+from datetime import datetime, time, timedelta
+
 from django.db import models
 from django.conf import settings
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.utils import timezone
 
 class Patient(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True)
     profile_picture = models.ImageField(upload_to='patient_profile_pics/', null=True, blank=True)
+    profile_picture_thumbnails = models.JSONField(default=dict, blank=True)  # {size: path}, see core.images
     blood_group = models.CharField(max_length=5, blank=True)
     medical_history = models.TextField(blank=True)
     address = models.CharField(max_length=255, blank=True)
@@ -15,13 +22,67 @@ class Patient(models.Model):
 class Doctor(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True)
     profile_picture = models.ImageField(upload_to='doctor_profile_pics/', null=True, blank=True)
+    profile_picture_thumbnails = models.JSONField(default=dict, blank=True)  # {size: path}, see core.images
     specialization = models.CharField(max_length=100)
     license_number = models.CharField(max_length=50, unique=True)
     availability = models.JSONField(default=dict) # e.g., {'Monday': ['09:00-12:00', '14:00-17:00']}
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['specialization'], name='doctor_specialization_idx'),
+            # doctor_list ETag: MAX(updated_at)
+            models.Index(fields=['updated_at'], name='doctor_updated_idx'),
+        ]
+
+    def clean(self):
+        from core.booking import parse_availability
+        try:
+            parse_availability(self.availability)
+        except (ValueError, AttributeError) as e:
+            raise ValidationError({'availability': str(e)})
 
     def __str__(self):
         return f"Dr. {self.user.first_name} {self.user.last_name} ({self.specialization})"
 
+class AvailabilityWindow(models.Model):
+    """
+    Normalized copy of Doctor.availability, one row per merged interval, kept
+    in sync by core.signals so "who is free at T" is a single indexed query.
+    """
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='availability_windows')
+    weekday = models.PositiveSmallIntegerField()  # Monday is 0
+    start_minute = models.PositiveSmallIntegerField()
+    end_minute = models.PositiveSmallIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['weekday', 'start_minute', 'end_minute'], name='availability_lookup_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.doctor_id}: {self.weekday} {self.start_minute}-{self.end_minute}"
+
+
+class AppointmentQuerySet(models.QuerySet):
+    def in_date_range(self, date_from=None, date_to=None):
+        """
+        Filter by local calendar dates using datetime bounds rather than
+        ``__date`` so the appointment_datetime indexes can be used.
+        """
+        qs = self
+        if date_from:
+            start = timezone.make_aware(datetime.combine(date_from, time.min))
+            qs = qs.filter(appointment_datetime__gte=start)
+        if date_to:
+            end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+            qs = qs.filter(appointment_datetime__lt=end)
+        return qs
+
+    def on_day(self, day):
+        return self.in_date_range(day, day)
+
+
 class Appointment(models.Model):
     STATUS_CHOICES = (
         ('scheduled', 'Scheduled'),
@@ -36,5 +97,68 @@ class Appointment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = AppointmentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # doctor_dashboard: a doctor's appointments for one day
+            models.Index(fields=['doctor', 'appointment_datetime'], name='appt_doctor_datetime_idx'),
+            # patient_dashboard: a patient's most recent appointments
+            models.Index(fields=['patient', '-appointment_datetime'], name='appt_patient_datetime_idx'),
+            # appointment_list / admin_dashboard: newest first, keyset on (datetime, id)
+            models.Index(fields=['-appointment_datetime', '-id'], name='appt_datetime_id_idx'),
+            # appointment_list filtered by status
+            models.Index(fields=['status', '-appointment_datetime', '-id'], name='appt_status_datetime_idx'),
+            # appointment_list ETag: MAX(updated_at)
+            models.Index(fields=['updated_at'], name='appt_updated_idx'),
+        ]
+
     def __str__(self):
         return f"Appointment with Dr. {self.doctor.user.last_name} for {self.patient.user.last_name} on {self.appointment_datetime.strftime('%Y-%m-%d %H:%M')}"
+
+
+class StatCounter(models.Model):
+    """
+    Denormalized counter maintained incrementally by signals (see core.stats).
+    """
+    key = models.CharField(max_length=100, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
+
+class ImageJob(models.Model):
+    """
+    Queued profile photo processing (core.images), claimed and run by
+    ``manage.py process_image_jobs``.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+    field_name = models.CharField(max_length=100)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Workers poll for the oldest pending jobs
+            models.Index(fields=['status', 'created_at'], name='imagejob_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.content_type.model} {self.object_id}.{self.field_name}: {self.status}"
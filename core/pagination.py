@@ -0,0 +1,113 @@
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class CursorPage:
+    """A single page of results produced by KeysetPaginator."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class KeysetPaginator:
+    """
+    Cursor (keyset) pagination over a descending ``(key, pk)`` ordering.
+
+    Instead of OFFSET, each page is fetched with a ``WHERE (key, pk) < cursor``
+    predicate, so the cost of a page does not grow with its position in the
+    table. Cursors are opaque URL-safe tokens; an invalid cursor falls back to
+    the first page.
+    """
+
+    def __init__(self, queryset, key, per_page=25):
+        self.queryset = queryset
+        self.key = key
+        self.per_page = per_page
+
+    def encode_cursor(self, direction, obj):
+        raw = f'{direction}|{getattr(obj, self.key).isoformat()}|{obj.pk}'
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, value, pk = base64.urlsafe_b64decode(padded).decode().split('|')
+            value = parse_datetime(value)
+            pk = int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+            return None
+        if direction not in ('n', 'p') or value is None:
+            return None
+        return direction, value, pk
+
+    def page(self, cursor=None):
+        qs, decoded, forward = self.page_queryset(cursor)
+        return self.make_page(list(qs), decoded, forward)
+
+    async def apage(self, cursor=None):
+        qs, decoded, forward = self.page_queryset(cursor)
+        return self.make_page([row async for row in qs], decoded, forward)
+
+    def page_queryset(self, cursor):
+        decoded = self.decode_cursor(cursor) if cursor else None
+        qs = self.queryset
+        forward = True
+
+        if decoded:
+            direction, value, pk = decoded
+            if direction == 'n':
+                qs = qs.filter(Q(**{f'{self.key}__lt': value}) | Q(**{self.key: value, 'pk__lt': pk}))
+            else:
+                forward = False
+                qs = qs.filter(Q(**{f'{self.key}__gt': value}) | Q(**{self.key: value, 'pk__gt': pk}))
+
+        if forward:
+            qs = qs.order_by(f'-{self.key}', '-pk')
+        else:
+            qs = qs.order_by(self.key, 'pk')
+
+        # Fetch one extra row to find out whether another page exists.
+        return qs[:self.per_page + 1], decoded, forward
+
+    def make_page(self, rows, decoded, forward):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        if not rows:
+            return CursorPage(rows)
+
+        if forward:
+            has_next, has_previous = has_more, decoded is not None
+        else:
+            has_next, has_previous = True, has_more
+
+        return CursorPage(
+            rows,
+            next_cursor=self.encode_cursor('n', rows[-1]) if has_next else None,
+            previous_cursor=self.encode_cursor('p', rows[0]) if has_previous else None,
+        )
@@ -0,0 +1,197 @@
+"""
+Read replica routing.
+
+When DATABASE_REPLICA_URL configures a "replica" alias, reads made inside
+``use_replica()``, or in views decorated with ``replica_reads``, go to it.
+Everything else, and every write, uses the primary, so code that does not
+opt in never sees replication lag.
+
+Read-after-write: ReplicaStickinessMiddleware notes when a request writes
+and sets a cookie that keeps the browser's following requests on the
+primary for REPLICA_STICKY_SECONDS, long enough for the replica to catch up.
+Reads later in the writing request itself also stay on the primary.
+
+Sessions and users are always read from the primary: authentication must
+see logouts and password changes immediately.
+
+Without a replica all of this changes nothing and the middleware removes
+itself.
+"""
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = 'replica'
+PRIMARY_ONLY_APPS = {'sessions', 'users'}
+SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+_request_state = contextvars.ContextVar('replica_request_state', default=None)
+
+
+class RequestState:
+    """Routing state of one request: whether it must read from the primary."""
+    def __init__(self, sticky=False):
+        self.sticky = sticky
+        self.wrote = False
+
+
+def replica_configured():
+    return REPLICA in connections.settings
+
+
+def reading_from_replica():
+    """Whether reads made now may go to the replica."""
+    state = _request_state.get()
+    return _replica_reads.get() and not (state and state.sticky) and replica_configured()
+
+
+@contextmanager
+def use_replica():
+    """Send reads in this block to the replica, if there is one."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def replica_iterator(iterable):
+    """
+    Iterate ``iterable`` with replica reads on. For streaming responses, whose
+    generators run after the view and the middleware have returned; the
+    request's stickiness is carried along.
+    """
+    iterator = iter(iterable)
+    state = _request_state.get()
+
+    def generate():
+        while True:
+            token = _request_state.set(state)
+            try:
+                with use_replica():
+                    item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                _request_state.reset(token)
+            yield item
+
+    return generate()
+
+
+def replica_reads(view):
+    """
+    Declare that a view's reads may lag the primary by a few seconds. GET
+    and HEAD requests, including the rendering of a TemplateResponse, read
+    from the replica; other methods are left alone. Works on async views too.
+    """
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if request.method not in SAFE_METHODS:
+                return await view(request, *args, **kwargs)
+            with use_replica():
+                response = await view(request, *args, **kwargs)
+                if hasattr(response, 'render') and not response.is_rendered:
+                    await sync_to_async(response.render)()
+            return response
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return view(request, *args, **kwargs)
+        with use_replica():
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                # Lazy querysets in the template must be read here as well
+                response.render()
+        return response
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in PRIMARY_ONLY_APPS and reading_from_replica():
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            state.wrote = True
+            # Read this request's own writes back from the primary
+            state.sticky = True
+        # Also for instances loaded from the replica, which Django would
+        # otherwise save back to the alias they came from
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Same data on both aliases
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # The replica follows the primary's schema through replication
+        if db == REPLICA:
+            return False
+        return None
+
+
+class ReplicaStickinessMiddleware:
+    """Keep a browser on the primary for a while after each of its writes."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replica_configured():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.start(request)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        token = _request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.finish(state, response)
+
+    def start(self, request):
+        try:
+            sticky = float(request.COOKIES.get(settings.REPLICA_STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            sticky = False
+        return RequestState(sticky=sticky)
+
+    def finish(self, state, response):
+        if state.wrote:
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE,
+                str(time.time() + settings.REPLICA_STICKY_SECONDS),
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
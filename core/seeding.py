@@ -0,0 +1,235 @@
+"""
+Bulk data generation for development and load testing.
+
+Rows are written with ``bulk_create`` in fixed-size batches, every synthetic
+user shares one precomputed password hash, and usernames are de-duplicated in
+memory, so seeding millions of rows is bounded by insert throughput rather than
+by per-row queries or password hashing.
+"""
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from faker import Faker
+
+from apps.patients.models import Patient as PatientProfile, DocumentUpload, PatientDocument, PatientIdSequence
+from apps.users.models import User
+from core import auth
+from core.booking import availability_windows
+from core.models import Patient, Doctor, Appointment, AvailabilityWindow
+
+SPECIALIZATIONS = ['Cardiology', 'Neurology', 'Pediatrics', 'Orthopedics', 'Dermatology']
+STATUS_WEIGHTS = {'scheduled': 6, 'completed': 3, 'cancelled': 1}
+DEFAULT_AVAILABILITY = {
+    day: ['09:00-12:00', '14:00-17:00']
+    for day in ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday')
+}
+POOL_SIZE = 1000
+
+
+def raw_delete(queryset):
+    """DELETE the rows of ``queryset`` in one statement, without collecting them first."""
+    connection = connections[queryset.db]
+    meta = queryset.model._meta
+    table, pk = connection.ops.quote_name(meta.db_table), connection.ops.quote_name(meta.pk.column)
+    select, params = queryset.values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {pk} IN ({select})', params)
+
+
+class BulkSeeder:
+    def __init__(self, batch_size=1000, password='password123', progress=None, seed=None):
+        self.batch_size = batch_size
+        self.progress = progress or (lambda message: None)
+        self.random = random.Random(seed)
+        fake = Faker()
+        if seed is not None:
+            fake.seed_instance(seed)
+        # Faker is far too slow to call per row at this scale; draw from pools.
+        self.first_names = [fake.first_name() for _ in range(POOL_SIZE)]
+        self.last_names = [fake.last_name() for _ in range(POOL_SIZE)]
+        self.addresses = [fake.address() for _ in range(POOL_SIZE)]
+        self.phone_numbers = [fake.phone_number()[:20] for _ in range(POOL_SIZE)]
+        self.reasons = [fake.sentence(nb_words=6) for _ in range(POOL_SIZE)]
+        self.password_hash = make_password(password)
+        self.usernames = set(User.objects.values_list('username', flat=True))
+        self.username_counts = {}
+        self.last_report = 0
+
+    def wipe(self):
+        """
+        Remove all non-superuser data. Raw deletes skip per-row signal
+        dispatch; run ``stats.reconcile`` afterwards.
+        """
+        for queryset in (
+            Appointment.objects.all(),
+            AvailabilityWindow.objects.all(),
+            Patient.objects.all(),
+            Doctor.objects.all(),
+            PatientDocument.objects.filter(patient__user__is_superuser=False),
+            DocumentUpload.objects.filter(Q(patient__user__is_superuser=False) | Q(uploaded_by__is_superuser=False)),
+            PatientProfile.objects.filter(user__is_superuser=False),
+        ):
+            raw_delete(queryset)
+        self.wipe_users()
+        self.usernames = set(User.objects.values_list('username', flat=True))
+        self.username_counts = {}
+
+    def wipe_users(self):
+        """Raw-delete non-superusers and the rows still pointing at them, a batch of pks at a time."""
+        # Admin log entries and group/permission links; the profile tables are already empty
+        relations = [
+            (field.related_model, field.field.name)
+            for field in User._meta.get_fields(include_hidden=True)
+            if field.auto_created and (field.one_to_many or field.one_to_one)
+        ]
+        users = User.objects.filter(is_superuser=False).order_by('pk')
+        while True:
+            pks = list(users.values_list('pk', flat=True)[:self.batch_size])
+            if not pks:
+                break
+            with transaction.atomic():
+                for model, name in relations:
+                    raw_delete(model.objects.filter(**{f'{name}__in': pks}))
+                raw_delete(User.objects.filter(pk__in=pks))
+            auth.invalidate_users(pks)
+
+    def unique_username(self, base):
+        count = self.username_counts.get(base, 0)
+        username = base if count == 0 else f'{base}{count}'
+        while username in self.usernames:
+            count += 1
+            username = f'{base}{count}'
+        self.username_counts[base] = count + 1
+        self.usernames.add(username)
+        return username
+
+    def batches(self, total):
+        done = 0
+        while done < total:
+            size = min(self.batch_size, total - done)
+            yield done, size
+            done += size
+
+    def report(self, label, done, total, started, force=False):
+        now = time.monotonic()
+        if not force and now - self.last_report < 1:
+            return
+        self.last_report = now
+        elapsed = max(now - started, 1e-9)
+        self.progress(f'{label}: {done}/{total} ({done / elapsed:,.0f} rows/s)')
+
+    def create_users(self, role, prefix, size):
+        users = []
+        for _ in range(size):
+            first_name = self.random.choice(self.first_names)
+            last_name = self.random.choice(self.last_names)
+            username = self.unique_username(f'{prefix}{first_name.lower()}_{last_name.lower()}')
+            users.append(User(
+                username=username,
+                first_name=first_name,
+                last_name=last_name,
+                email=f'{username}@hms.com',
+                password=self.password_hash,
+                role=role,
+            ))
+        created = User.objects.bulk_create(users, batch_size=self.batch_size)
+        if any(user.pk is None for user in created):
+            # Backends that cannot return ids from bulk inserts
+            ids = dict(User.objects.filter(
+                username__in=[user.username for user in created]
+            ).values_list('username', 'pk'))
+            for user in created:
+                user.pk = ids[user.username]
+        return created
+
+    def seed_doctors(self, total):
+        pks = []
+        started = self.last_report = time.monotonic()
+        for offset, size in self.batches(total):
+            with transaction.atomic():
+                users = self.create_users(User.Role.DOCTOR, 'dr_', size)
+                doctors = Doctor.objects.bulk_create([
+                    Doctor(
+                        user=user,
+                        specialization=SPECIALIZATIONS[(offset + i) % len(SPECIALIZATIONS)],
+                        license_number=f'LIC-{user.pk:09d}',
+                        availability=DEFAULT_AVAILABILITY,
+                    )
+                    for i, user in enumerate(users)
+                ], batch_size=self.batch_size)
+                AvailabilityWindow.objects.bulk_create([
+                    window for doctor in doctors for window in availability_windows(doctor)
+                ], batch_size=self.batch_size)
+            pks.extend(user.pk for user in users)
+            self.report('doctors', offset + size, total, started)
+        self.report('doctors', total, total, started, force=True)
+        return pks
+
+    def seed_patients(self, total, profiles=False):
+        """
+        Create patients; with ``profiles`` also their apps.patients
+        registration profile, with a patient ID and search column.
+        """
+        pks = []
+        started = self.last_report = time.monotonic()
+        for offset, size in self.batches(total):
+            with transaction.atomic():
+                users = self.create_users(User.Role.PATIENT, 'patient_', size)
+                patients = Patient.objects.bulk_create([
+                    Patient(
+                        user=user,
+                        address=self.random.choice(self.addresses)[:255],
+                        phone_number=self.random.choice(self.phone_numbers),
+                    )
+                    for user in users
+                ], batch_size=self.batch_size)
+                if profiles:
+                    self.create_profiles(patients)
+            pks.extend(user.pk for user in users)
+            self.report('patients', offset + size, total, started)
+        self.report('patients', total, total, started, force=True)
+        return pks
+
+    def create_profiles(self, patients):
+        rows = []
+        for patient, patient_id in zip(patients, PatientIdSequence.allocate_ids(len(patients))):
+            profile = PatientProfile(
+                user=patient.user,
+                patient_id=patient_id,
+                phone_number=patient.phone_number,
+                address=patient.address,
+                insurance_policy_number=f'POL-{patient.user.pk:09d}',
+            )
+            # bulk_create bypasses Patient.save()
+            profile.search_text = profile.build_search_text()
+            rows.append(profile)
+        PatientProfile.objects.bulk_create(rows, batch_size=self.batch_size)
+
+    def seed_appointments(self, total, patient_pks, doctor_pks, days=365):
+        if total and not (patient_pks and doctor_pks):
+            raise ValueError('Appointments need at least one patient and one doctor.')
+        statuses = list(STATUS_WEIGHTS)
+        weights = list(STATUS_WEIGHTS.values())
+        # Spread appointments over half-hour slots around today
+        start = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(days=days // 2)
+        slots = days * 48
+        started = self.last_report = time.monotonic()
+        for offset, size in self.batches(total):
+            with transaction.atomic():
+                Appointment.objects.bulk_create([
+                    Appointment(
+                        patient_id=self.random.choice(patient_pks),
+                        doctor_id=self.random.choice(doctor_pks),
+                        appointment_datetime=start + timedelta(minutes=30 * self.random.randrange(slots)),
+                        reason=self.random.choice(self.reasons),
+                        status=self.random.choices(statuses, weights)[0],
+                    )
+                    for _ in range(size)
+                ], batch_size=self.batch_size)
+            self.report('appointments', offset + size, total, started)
+        self.report('appointments', total, total, started, force=True)
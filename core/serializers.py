@@ -0,0 +1,49 @@
+from rest_framework import serializers
+from .models import Doctor, Appointment
+
+
+def requested_fields(request):
+    """The set of field names from a ``?fields=a,b`` parameter, or None."""
+    if request is None:
+        return None
+    value = request.query_params.get('fields')
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsetMixin:
+    """Drop every field not listed in the request's ``?fields=`` parameter."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = requested_fields(self.context.get('request'))
+        if fields:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
+
+class DoctorSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    first_name = serializers.CharField(source='user.first_name', read_only=True)
+    last_name = serializers.CharField(source='user.last_name', read_only=True)
+    email = serializers.EmailField(source='user.email', read_only=True)
+
+    class Meta:
+        model = Doctor
+        fields = ['user', 'first_name', 'last_name', 'email', 'specialization',
+                  'license_number', 'availability', 'profile_picture']
+
+
+class AppointmentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    patient_name = serializers.SerializerMethodField()
+    doctor_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Appointment
+        fields = ['id', 'patient', 'patient_name', 'doctor', 'doctor_name', 'appointment_datetime',
+                  'reason', 'status', 'created_at', 'updated_at']
+
+    def get_patient_name(self, obj):
+        return f"{obj.patient.user.first_name} {obj.patient.user.last_name}"
+
+    def get_doctor_name(self, obj):
+        return f"Dr. {obj.doctor.user.first_name} {obj.doctor.user.last_name}"
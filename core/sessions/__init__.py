@@ -0,0 +1,29 @@
+"""
+Session engines selected by settings.SESSION_MODE.
+
+Django marks a session modified on every assignment, even of the value it
+already holds, and a modified session is written back at the end of the
+request. These stores compare first, so storing an unchanged value costs
+nothing. Only immutable scalars are compared: a list or dict read from the
+session, changed in place and assigned back equals the stored value, yet has
+to be saved.
+"""
+SCALARS = (str, int, float, bool, type(None))
+
+
+def unchanged(session, key, value):
+    if key not in session or not isinstance(value, SCALARS):
+        return False
+    stored = session[key]
+    return type(stored) is type(value) and stored == value
+
+
+class SkipUnchangedWritesMixin:
+    def __setitem__(self, key, value):
+        if unchanged(self._session, key, value):
+            return
+        super().__setitem__(key, value)
+
+    def update(self, dict_):
+        if not all(unchanged(self._session, key, value) for key, value in dict_.items()):
+            super().update(dict_)
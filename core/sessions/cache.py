@@ -0,0 +1,7 @@
+from django.contrib.sessions.backends import cache
+
+from . import SkipUnchangedWritesMixin
+
+
+class SessionStore(SkipUnchangedWritesMixin, cache.SessionStore):
+    pass
@@ -0,0 +1,7 @@
+from django.contrib.sessions.backends import cached_db
+
+from . import SkipUnchangedWritesMixin
+
+
+class SessionStore(SkipUnchangedWritesMixin, cached_db.SessionStore):
+    pass
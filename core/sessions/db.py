@@ -0,0 +1,7 @@
+from django.contrib.sessions.backends import db
+
+from . import SkipUnchangedWritesMixin
+
+
+class SessionStore(SkipUnchangedWritesMixin, db.SessionStore):
+    pass
@@ -0,0 +1,155 @@
+from django.db.models import Q
+from django.db import connections
+from django.db.models.signals import post_delete, post_init, post_migrate, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.patients import search
+from apps.patients.models import Patient
+from apps.users.models import User
+from core import auth, booking, images, stats
+from core.models import Doctor, Appointment, Patient as CorePatient
+
+
+@receiver(post_init, sender=Appointment)
+def remember_appointment_state(sender, instance, **kwargs):
+    # Keep the values the row was loaded with so updates can move counts
+    # between buckets without re-reading the row. Deferred fields are left
+    # alone so .only() querysets do not trigger extra loads.
+    loaded = instance.__dict__
+    if instance.pk and 'status' in loaded and 'appointment_datetime' in loaded:
+        instance._stats_state = (loaded['status'], loaded['appointment_datetime'])
+    else:
+        instance._stats_state = None
+
+
+@receiver(post_save, sender=Appointment)
+def count_appointment_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_state = instance._stats_state
+    if not created and old_state is None:
+        # Partially loaded instance: previous bucket unknown, leave the
+        # counters for reconcile_stats to correct.
+        return
+    deltas = {key: 1 for key in stats.appointment_keys(instance.status, instance.appointment_datetime)}
+    if not created:
+        for key in stats.appointment_keys(*old_state):
+            deltas[key] = deltas.get(key, 0) - 1
+    stats.increment(deltas)
+    instance._stats_state = (instance.status, instance.appointment_datetime)
+
+
+@receiver(post_delete, sender=Appointment)
+def count_appointment_delete(sender, instance, **kwargs):
+    state = instance._stats_state or (instance.status, instance.appointment_datetime)
+    stats.increment({key: -1 for key in stats.appointment_keys(*state)})
+
+
+@receiver(post_save, sender=Doctor)
+def sync_doctor_availability(sender, instance, raw=False, **kwargs):
+    if not raw:
+        booking.sync_availability_windows(instance)
+
+
+@receiver(post_save, sender=Patient)
+@receiver(post_save, sender=Doctor)
+def count_profile_save(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        key = stats.TOTAL_PATIENTS if sender is Patient else stats.TOTAL_DOCTORS
+        stats.increment({key: 1})
+
+
+@receiver(post_delete, sender=Patient)
+@receiver(post_delete, sender=Doctor)
+def count_profile_delete(sender, instance, **kwargs):
+    key = stats.TOTAL_PATIENTS if sender is Patient else stats.TOTAL_DOCTORS
+    stats.increment({key: -1})
+
+
+# User fields rendered on doctor, patient and appointment list rows
+LISTED_USER_FIELDS = ('first_name', 'last_name', 'email')
+
+
+@receiver(post_init, sender=User)
+def remember_listed_user_fields(sender, instance, **kwargs):
+    loaded = instance.__dict__
+    instance._listed_state = tuple(loaded.get(field) for field in LISTED_USER_FIELDS)
+
+
+@receiver(post_save, sender=User)
+def touch_rows_listing_user(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # List pages derive their ETag from MAX(updated_at); bump the rows that
+    # show this user's name so renamed users do not leave stale 304s behind.
+    if update_fields is not None and not set(update_fields) & set(LISTED_USER_FIELDS):
+        return
+    state = tuple(getattr(instance, field) for field in LISTED_USER_FIELDS)
+    if created or raw or state == instance._listed_state:
+        return
+    now = timezone.now()
+    Doctor.objects.filter(user_id=instance.pk).update(updated_at=now)
+    for profile in Patient.objects.filter(user_id=instance.pk):
+        # The name and email are part of the patient's search column
+        Patient.objects.filter(pk=profile.pk).update(
+            updated_at=now, search_text=profile.build_search_text(instance))
+    Appointment.objects.filter(Q(patient_id=instance.pk) | Q(doctor_id=instance.pk)).update(updated_at=now)
+    instance._listed_state = state
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    auth.invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=Patient)
+@receiver(post_delete, sender=Patient)
+@receiver(post_save, sender=CorePatient)
+@receiver(post_delete, sender=CorePatient)
+@receiver(post_save, sender=Doctor)
+@receiver(post_delete, sender=Doctor)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    auth.invalidate_user(instance.user_id)
+
+
+@receiver(post_init, sender=Patient)
+@receiver(post_init, sender=CorePatient)
+@receiver(post_init, sender=Doctor)
+def remember_image_names(sender, instance, **kwargs):
+    loaded = instance.__dict__
+    instance._image_names = {
+        field: getattr(loaded[field], 'name', loaded[field]) or ''
+        for field in images.image_fields(sender) if field in loaded
+    }
+
+
+@receiver(post_save, sender=Patient)
+@receiver(post_save, sender=CorePatient)
+@receiver(post_save, sender=Doctor)
+def queue_image_processing(sender, instance, created, raw=False, **kwargs):
+    # Only queue work here; the request returns without touching the image.
+    if raw:
+        return
+    for field in images.image_fields(sender):
+        if field not in instance._image_names:
+            continue
+        name = getattr(instance, field).name or ''
+        if name == instance._image_names[field] and not created:
+            continue
+        instance._image_names[field] = name
+        thumbnails = f'{field}_thumbnails'
+        if getattr(instance, thumbnails):
+            # Thumbnails of the replaced photo must not be shown for the new one
+            setattr(instance, thumbnails, {})
+            sender.objects.filter(pk=instance.pk).update(**{thumbnails: {}})
+        if name:
+            images.enqueue(instance, field)
+
+
+@receiver(post_migrate)
+def restore_patient_search_index(sender, app_config, using, **kwargs):
+    # SQLite drops the FTS triggers whenever a migration rebuilds
+    # patients_patient; put back whatever is missing
+    connection = connections[using]
+    if app_config.label == 'patients' and search.installable(connection):
+        search.install(connection)
@@ -0,0 +1,134 @@
+"""
+Incrementally maintained dashboard statistics.
+
+Counters live in the StatCounter table and are adjusted by the signal
+handlers in core.signals whenever a Patient, Doctor or Appointment is saved
+or deleted, so reading them is a single primary-key lookup instead of a
+COUNT(*) over each table. Writes that bypass signals (bulk_create,
+QuerySet.update) must either call ``increment`` themselves or be followed by
+``reconcile`` (``manage.py reconcile_stats``).
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.patients.models import Patient
+from core.models import Doctor, Appointment, StatCounter
+
+TOTAL_PATIENTS = 'patients:total'
+TOTAL_DOCTORS = 'doctors:total'
+TOTAL_APPOINTMENTS = 'appointments:total'
+
+
+def status_key(status):
+    return f'appointments:status:{status}'
+
+
+def day_key(day):
+    return f'appointments:day:{day.isoformat()}'
+
+
+def appointment_keys(status, appointment_datetime):
+    """Counter keys an appointment with the given values contributes to."""
+    keys = [TOTAL_APPOINTMENTS, status_key(status)]
+    if appointment_datetime is not None:
+        keys.append(day_key(timezone.localdate(appointment_datetime)))
+    return keys
+
+
+def increment(deltas):
+    """Apply ``{key: delta}`` to the counters, creating missing rows."""
+    for key, delta in deltas.items():
+        if not delta:
+            continue
+        updated = StatCounter.objects.filter(key=key).update(value=F('value') + delta)
+        if updated:
+            continue
+        try:
+            with transaction.atomic():
+                StatCounter.objects.create(key=key, value=delta)
+        except IntegrityError:
+            # Another worker created the row first
+            StatCounter.objects.filter(key=key).update(value=F('value') + delta)
+
+
+def read(*keys):
+    """Current values of ``keys`` as a tuple, 0 for missing counters."""
+    values = dict(StatCounter.objects.filter(key__in=keys).values_list('key', 'value'))
+    return tuple(values.get(key, 0) for key in keys)
+
+
+def snapshot(day=None):
+    """Read the dashboard counters in a single query."""
+    day = day or timezone.localdate()
+    keys = snapshot_keys(day)
+    values = dict(StatCounter.objects.filter(key__in=keys).values_list('key', 'value'))
+    return snapshot_from(values, day)
+
+
+async def asnapshot(day=None):
+    """``snapshot`` for async views."""
+    day = day or timezone.localdate()
+    keys = snapshot_keys(day)
+    values = {key: value async for key, value in StatCounter.objects.filter(key__in=keys).values_list('key', 'value')}
+    return snapshot_from(values, day)
+
+
+def snapshot_keys(day):
+    statuses = [value for value, _ in Appointment.STATUS_CHOICES]
+    return [TOTAL_PATIENTS, TOTAL_DOCTORS, TOTAL_APPOINTMENTS, day_key(day)] + [status_key(status) for status in statuses]
+
+
+def snapshot_from(values, day):
+    statuses = [value for value, _ in Appointment.STATUS_CHOICES]
+    return {
+        'total_patients': values.get(TOTAL_PATIENTS, 0),
+        'total_doctors': values.get(TOTAL_DOCTORS, 0),
+        'total_appointments': values.get(TOTAL_APPOINTMENTS, 0),
+        'appointments_today': values.get(day_key(day), 0),
+        'appointments_by_status': {status: values.get(status_key(status), 0) for status in statuses},
+    }
+
+
+def compute():
+    """Count everything from scratch. Expensive; used by ``reconcile``."""
+    counts = {
+        TOTAL_PATIENTS: Patient.objects.count(),
+        TOTAL_DOCTORS: Doctor.objects.count(),
+        TOTAL_APPOINTMENTS: Appointment.objects.count(),
+    }
+    for row in Appointment.objects.values('status').annotate(n=Count('pk')).order_by():
+        counts[status_key(row['status'])] = row['n']
+    by_day = Appointment.objects.annotate(
+        day=TruncDate('appointment_datetime')
+    ).values('day').annotate(n=Count('pk')).order_by()
+    for row in by_day:
+        counts[day_key(row['day'])] = row['n']
+    return counts
+
+
+@transaction.atomic
+def reconcile():
+    """
+    Rebuild every counter from the source tables. Returns ``{key: (old, new)}``
+    for the counters that had drifted.
+
+    The counter rows are locked before anything is counted, so an
+    ``increment`` made meanwhile waits and lands on top of the rebuilt
+    values instead of being overwritten by them. Counters first created
+    meanwhile are upserted rather than deleted.
+    """
+    current = dict(StatCounter.objects.select_for_update().values_list('key', 'value'))
+    counts = compute()
+    drift = {
+        key: (current.get(key, 0), counts.get(key, 0))
+        for key in set(current) | set(counts)
+        if current.get(key, 0) != counts.get(key, 0)
+    }
+    StatCounter.objects.filter(key__in=[key for key in current if not counts.get(key)]).delete()
+    StatCounter.objects.bulk_create(
+        [StatCounter(key=key, value=value) for key, value in counts.items() if value],
+        update_conflicts=True, unique_fields=['key'], update_fields=['value'],
+    )
+    return drift
@@ -0,0 +1,13 @@
+from django import template
+
+from core import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def thumbnail_url(instance, size):
+    """``{% thumbnail_url patient 128 as url %}``: processed thumbnail URL, or None."""
+    if instance is None:
+        return None
+    return images.thumbnail_url(instance, int(size))
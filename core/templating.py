@@ -0,0 +1,32 @@
+"""
+Django template backend that reports render time to core.metrics.
+
+Only top-level renders go through the backend (includes and extends are
+rendered by the engine inside them), so the time is not double counted.
+Outside an instrumented request it behaves exactly like DjangoTemplates.
+"""
+import time
+
+from django.template.backends import django as django_backend
+
+from core import metrics
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        sample = metrics.current_sample()
+        if sample is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            sample.template_time += time.perf_counter() - start
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name).template, self)
@@ -0,0 +1,47 @@
+"""
+Query budgets for tests.
+
+``query_budget`` works as a context manager or decorator and fails when the
+wrapped code runs more queries than declared, listing every query so N+1
+patterns are easy to spot:
+
+    with query_budget(4):
+        self.client.get(url)
+
+    @query_budget(2)
+    def test_something(self):
+        ...
+"""
+from contextlib import ContextDecorator
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class query_budget(ContextDecorator):
+    def __init__(self, max_queries, using=DEFAULT_DB_ALIAS, label=''):
+        self.max_queries = max_queries
+        self.using = using
+        self.label = label
+
+    def __enter__(self):
+        self.context = CaptureQueriesContext(connections[self.using])
+        return self.context.__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.context.__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return
+        executed = len(self.context)
+        if executed > self.max_queries:
+            queries = '\n'.join(
+                f'{i}. {query["sql"]}' for i, query in enumerate(self.context.captured_queries, start=1)
+            )
+            label = f'{self.label}: ' if self.label else ''
+            raise QueryBudgetExceeded(
+                f'{label}{executed} queries executed, budget is {self.max_queries}\n{queries}'
+            )
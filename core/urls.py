@@ -11,14 +11,20 @@ urlpatterns = [
     path('patient/', views.patient_dashboard, name='patient-dashboard'),
     path('patients/list/', views.PatientListView.as_view(), name='patient-list'),
     path('doctors/', views.doctor_list, name='doctor-list'),
+    path('doctors/available/', views.available_doctors, name='available-doctors'),
+    path('doctors/autocomplete/', views.doctor_autocomplete, name='doctor-autocomplete'),
+    path('doctors/<int:pk>/slots/', views.doctor_free_slots, name='doctor-free-slots'),
     path('appointments/', views.appointment_list, name='appointment-list'),
+    path('appointments/export/', views.export_appointments, name='appointment-export'),
     path('appointments/create/', views.appointment_create, name='appointment-create'),
     path('appointments/<int:pk>/', views.appointment_detail, name='appointment-detail'),
     path('appointments/<int:pk>/cancel/', views.appointment_cancel, name='appointment-cancel'),
+    path('patients/export/', views.export_patients, name='patient-export'),
     path('medical-records/', views.medical_records, name='medical-records'),
     path('prescriptions/', views.prescriptions, name='prescriptions'),
     path('settings/', views.settings_view, name='settings'),
     path('messages/', views.messages, name='messages'),
     path('profile/', views.profile, name='profile'),
+    path('metrics/', views.performance_metrics, name='metrics'),
 ]
 
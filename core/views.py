@@ -1,18 +1,61 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import TemplateView, ListView
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
+from django.conf import settings
 from django.utils.decorators import method_decorator
-from django.contrib import messages
-from django.views.decorators.cache import never_cache
-from django.http import HttpResponse
+from django.contrib import messages as django_messages
+from django.db import transaction
+from django.db.models import Q
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from apps.users.models import User
+from apps.patients import search
 from apps.patients.models import Patient
 from core.models import Doctor, Appointment
-from datetime import datetime
+from core import booking, exports, metrics, stats
+from core.auth import dashboard_url_name, get_profile
+from core.forms import AppointmentFilterForm, AppointmentForm
+from core.http import list_etag, no_store, private_conditional
+from core.pagination import KeysetPaginator
+from core.routers import replica_iterator, replica_reads
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.utils.dateparse import parse_datetime
+
+APPOINTMENTS_PER_PAGE = 25
+PATIENTS_PER_PAGE = 25
+AUTOCOMPLETE_RESULTS = 10
+PATIENT_SEARCH_RESULTS = 50
+
+
+async def fetch_all(queryset):
+    """Evaluate ``queryset`` from async code, for asyncio.gather."""
+    return [obj async for obj in queryset]
+
+
+def cursor_queries(request, page):
+    """Query strings of the previous and next page of ``page``; None where there is none."""
+    # Page links keep the other parameters and only swap the cursor
+    query = request.GET.copy()
+    query.pop('cursor', None)
+    if page.has_next:
+        query['cursor'] = page.next_cursor
+        next_query = query.urlencode()
+    else:
+        next_query = None
+    if page.has_previous:
+        query['cursor'] = page.previous_cursor
+        previous_query = query.urlencode()
+    else:
+        previous_query = None
+    return previous_query, next_query
 
 
 @method_decorator(login_required, name='dispatch')
-@method_decorator(never_cache, name='dispatch')
+@method_decorator(no_store, name='dispatch')
 class DashboardView(TemplateView):
     """Main dashboard - redirects based on user role."""
     template_name = "dashboard.html"
@@ -29,15 +72,10 @@ class DashboardView(TemplateView):
             logout(request)
             return redirect('login')
         
-        # Redirect based on actual user role (compare as string)
-        user_role = str(request.user.role)
-        
-        if user_role == 'ADMIN':
-            return redirect('core:admin-dashboard')
-        elif user_role == 'DOCTOR':
-            return redirect('core:doctor-dashboard')
-        elif user_role == 'PATIENT':
-            return redirect('core:patient-dashboard')
+        # Redirect based on actual user role
+        url_name = dashboard_url_name(request.user)
+        if url_name:
+            return redirect(url_name)
         
         # If no role matches, logout and redirect to login
         from django.contrib.auth import logout
@@ -46,181 +84,346 @@ class DashboardView(TemplateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@method_decorator(replica_reads, name='dispatch')
+@method_decorator(private_conditional(etag_func=list_etag(Patient, stats.TOTAL_PATIENTS)), name='dispatch')
 class PatientListView(ListView):
     model = Patient
     template_name = 'patient_list.html'
     context_object_name = 'patients'
-    
+
+    async def dispatch(self, request, *args, **kwargs):
+        # Async, so the decorators above take their async paths
+        return await super().dispatch(request, *args, **kwargs)
+
     def get_queryset(self):
         return Patient.objects.select_related('user').order_by('-created_at')
 
+    async def get(self, request, *args, **kwargs):
+        self.query = request.GET.get('q', '').strip()
+        self.page_queries = (None, None)
+        if self.query:
+            # Raw SQL against the search index; already capped at the best matches
+            self.object_list = await sync_to_async(search.search)(self.query, limit=PATIENT_SEARCH_RESULTS)
+        else:
+            # One page at a time, without an OFFSET or a COUNT over the table
+            self.object_list = await KeysetPaginator(
+                self.get_queryset(), 'created_at', per_page=PATIENTS_PER_PAGE
+            ).apage(request.GET.get('cursor'))
+            self.page_queries = cursor_queries(request, self.object_list)
+        return self.render_to_response(self.get_context_data())
+
+    def get_context_data(self, **kwargs):
+        previous_query, next_query = self.page_queries
+        return super().get_context_data(
+            query=self.query, previous_query=previous_query, next_query=next_query, **kwargs)
+
 
 @login_required
-@never_cache
-def admin_dashboard(request):
+@replica_reads
+@no_store
+async def admin_dashboard(request):
     """Admin/Administrator dashboard view."""
+    user = await request.auser()
     # Use string comparison for role check
-    if str(request.user.role) != 'ADMIN':
+    if str(user.role) != 'ADMIN':
         return redirect('core:dashboard')
     
-    # Get statistics
-    total_patients = Patient.objects.count()
-    total_doctors = Doctor.objects.count()
-    total_appointments = Appointment.objects.count()
-    recent_appointments = Appointment.objects.select_related('patient__user', 'doctor__user').order_by('-appointment_datetime')[:5]
+    # Statistics from the incrementally maintained counters, and the latest
+    # appointments; neither depends on the other
+    context, recent_appointments = await asyncio.gather(
+        stats.asnapshot(),
+        fetch_all(Appointment.objects.select_related('patient__user', 'doctor__user').order_by('-appointment_datetime')[:5]),
+    )
+    context['recent_appointments'] = recent_appointments
     
-    # Set no-cache headers
-    response = render(request, 'admin_dashboard.html', {
-        'total_patients': total_patients,
-        'total_doctors': total_doctors,
-        'total_appointments': total_appointments,
-        'recent_appointments': recent_appointments,
-    })
-    response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-    response['Pragma'] = 'no-cache'
-    response['Expires'] = '0'
-    return response
+    return render(request, 'admin_dashboard.html', context)
 
 
 @login_required
-@never_cache
-def doctor_dashboard(request):
+@replica_reads
+@no_store
+async def doctor_dashboard(request):
     """Doctor dashboard view."""
+    user = await request.auser()
     # Use string comparison for role check
-    if str(request.user.role) != 'DOCTOR':
+    if str(user.role) != 'DOCTOR':
         return redirect('core:dashboard')
     
-    doctor = None
     today_appointments = []
     
-    try:
-        doctor = Doctor.objects.get(user=request.user)
+    # Profile comes from the user cache; None for doctors without a profile yet
+    doctor = await sync_to_async(get_profile)(user)
+    if doctor is not None:
         # Get today's appointments for this doctor
-        today = datetime.now().date()
-        today_appointments = Appointment.objects.filter(
-            doctor=doctor,
-            appointment_datetime__date=today
-        ).select_related('patient__user').order_by('appointment_datetime')
-    except Doctor.DoesNotExist:
-        # Create a placeholder for new doctors
-        pass
+        today_appointments = await fetch_all(Appointment.objects.filter(
+            doctor=doctor
+        ).on_day(timezone.localdate()).select_related('patient__user').order_by('appointment_datetime'))
     
-    # Set no-cache headers
-    response = render(request, 'doctor_dashboard.html', {
+    return render(request, 'doctor_dashboard.html', {
         'doctor': doctor,
         'today_appointments': today_appointments,
-        'today': datetime.now().date(),
+        'today': timezone.localdate(),
     })
-    response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-    response['Pragma'] = 'no-cache'
-    response['Expires'] = '0'
-    return response
 
 
 @login_required
-@never_cache
-def patient_dashboard(request):
+@replica_reads
+@no_store
+async def patient_dashboard(request):
     """Patient dashboard view."""
+    user = await request.auser()
     # Use string comparison for role check
-    if str(request.user.role) != 'PATIENT':
+    if str(user.role) != 'PATIENT':
         return redirect('core:dashboard')
     
-    patient = None
-    appointments = []
+    # Profile comes from the user cache (None for patients without a profile
+    # yet); appointments are keyed on the user, so both load together.
+    # Appointment.patient points at core.Patient, whose pk is the user id
+    patient, appointments = await asyncio.gather(
+        sync_to_async(get_profile)(user),
+        fetch_all(Appointment.objects.filter(
+            patient_id=user.pk
+        ).select_related('doctor__user').order_by('-appointment_datetime')[:5]),
+    )
+    if patient is None:
+        appointments = []
     
-    try:
-        patient = Patient.objects.get(user=request.user)
-        # Get appointments for this patient
-        appointments = Appointment.objects.filter(
-            patient=patient
-        ).select_related('doctor__user').order_by('-appointment_datetime')[:5]
-    except Patient.DoesNotExist:
-        # Create a placeholder for new patients
-        pass
-    
-    # Set no-cache headers
-    response = render(request, 'patient_dashboard.html', {
+    return render(request, 'patient_dashboard.html', {
         'patient': patient,
         'appointments': appointments,
     })
-    response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-    response['Pragma'] = 'no-cache'
-    response['Expires'] = '0'
-    return response
 
 
 @login_required
-@never_cache
-def doctor_list(request):
+@replica_reads
+@private_conditional(etag_func=list_etag(Doctor, stats.TOTAL_DOCTORS))
+async def doctor_list(request):
     """List all doctors - Admin view."""
-    if request.user.role != User.Role.ADMIN:
+    user = await request.auser()
+    if user.role != User.Role.ADMIN:
         return redirect('dashboard')
     
-    doctors = Doctor.objects.select_related('user').all()
+    doctors = await fetch_all(Doctor.objects.select_related('user'))
     return render(request, 'doctor_list.html', {'doctors': doctors})
 
 
 @login_required
-@never_cache
-def appointment_list(request):
+@replica_reads
+@private_conditional(etag_func=list_etag(Appointment, stats.TOTAL_APPOINTMENTS))
+async def appointment_list(request):
     """List all appointments."""
-    if not request.user.is_authenticated:
-        return redirect('login')
+    filter_form = AppointmentFilterForm(request.GET)
+    appointments = filter_form.filter(
+        Appointment.objects.select_related('patient__user', 'doctor__user')
+    )
+    page = await KeysetPaginator(
+        appointments, 'appointment_datetime', per_page=APPOINTMENTS_PER_PAGE
+    ).apage(request.GET.get('cursor'))
+    previous_query, next_query = cursor_queries(request, page)
+    
+    return render(request, 'appointment_list.html', {
+        'appointments': page,
+        'filter_form': filter_form,
+        'next_query': next_query,
+        'previous_query': previous_query,
+    })
+
+
+def streaming_export(request, name, rows_for_format):
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in exports.FORMATS:
+        return HttpResponse(f'Unsupported format "{fmt}".', status=400)
+    # Exports read whole tables; let a replica carry them when there is one
+    response = StreamingHttpResponse(replica_iterator(rows_for_format(fmt)), content_type=exports.FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{name}.{fmt}"'
+    return response
+
+
+@login_required
+@no_store
+def export_appointments(request):
+    """Stream appointments (honouring the list filters) as CSV or NDJSON - Admin view."""
+    if request.user.role != User.Role.ADMIN:
+        return redirect('core:dashboard')
     
-    appointments = Appointment.objects.select_related(
-        'patient__user', 'doctor__user'
-    ).order_by('-appointment_datetime')
+    queryset = AppointmentFilterForm(request.GET).filter(Appointment.objects.all())
+    return streaming_export(request, 'appointments',
+                            lambda fmt: exports.export_appointments(fmt, queryset))
+
+
+@login_required
+@no_store
+def export_patients(request):
+    """Stream patients as CSV or NDJSON - Admin view."""
+    if request.user.role != User.Role.ADMIN:
+        return redirect('core:dashboard')
     
-    return render(request, 'appointment_list.html', {'appointments': appointments})
+    return streaming_export(request, 'patients', exports.export_patients)
 
 
 @login_required
-@never_cache
+@no_store
 def appointment_create(request):
     """Create new appointment."""
     if not request.user.is_authenticated:
         return redirect('login')
     
+    own_patient = request.user.role == User.Role.PATIENT
     if request.method == 'POST':
-        # Handle appointment creation
-        messages.success(request, 'Appointment created successfully!')
-        return redirect('core:appointment-list')
-    
-    # Get context for creating appointment
-    patients = Patient.objects.select_related('user').all()
-    doctors = Doctor.objects.select_related('user').all()
-    
+        data = request.POST
+        if own_patient:
+            # Patients book for themselves only
+            data = data.copy()
+            data['patient'] = request.user.pk
+        form = AppointmentForm(data)
+        if form.is_valid():
+            try:
+                booking.book_appointment(
+                    booking.appointment_patient(form.cleaned_data['patient']),
+                    form.cleaned_data['doctor'],
+                    form.cleaned_data['appointment_datetime'],
+                    reason=form.cleaned_data['reason'],
+                )
+            except booking.SlotUnavailable as e:
+                form.add_error(None, str(e))
+            else:
+                django_messages.success(request, 'Appointment created successfully!')
+                return redirect('core:appointment-list')
+    else:
+        form = AppointmentForm(initial={'patient': request.user.pk} if own_patient else None)
+
+    # The pickers search through typeahead endpoints; only the current
+    # choices are looked up, so the page costs the same for any number of
+    # patients and doctors.
     return render(request, 'appointment_create.html', {
-        'patients': patients,
-        'doctors': doctors
+        'form': form,
+        'own_patient': own_patient,
+        'patient_label': picker_label(form['patient'].value(), patient_label),
+        'doctor_label': picker_label(form['doctor'].value(), doctor_label),
     })
 
 
+def patient_label(user_id):
+    patient = (Patient.objects.select_related('user')
+               .only('patient_id', 'user__first_name', 'user__last_name').filter(user_id=user_id).first())
+    return f'{patient.user.first_name} {patient.user.last_name} ({patient.patient_id})' if patient else ''
+
+
+def doctor_label(pk):
+    doctor = (Doctor.objects.select_related('user')
+              .only('specialization', 'user__first_name', 'user__last_name').filter(pk=pk).first())
+    return f'Dr. {doctor.user.first_name} {doctor.user.last_name} - {doctor.specialization}' if doctor else ''
+
+
+def picker_label(value, label):
+    try:
+        return label(int(value)) if value else ''
+    except (TypeError, ValueError):
+        return ''
+
+
 @login_required
-@never_cache
+def doctor_autocomplete(request):
+    """
+    Doctors whose first name, last name or specialization starts with each
+    word of ``?q=``, optionally only ``?specialization=``, as JSON.
+    """
+    try:
+        limit = min(int(request.GET.get('limit', AUTOCOMPLETE_RESULTS)), 50)
+    except ValueError:
+        limit = AUTOCOMPLETE_RESULTS
+    doctors = Doctor.objects.select_related('user').only(
+        'specialization', 'user__first_name', 'user__last_name')
+    if request.GET.get('specialization'):
+        doctors = doctors.filter(specialization=request.GET['specialization'])
+    for word in request.GET.get('q', '').split():
+        doctors = doctors.filter(
+            Q(user__last_name__istartswith=word) | Q(user__first_name__istartswith=word)
+            | Q(specialization__istartswith=word)
+        )
+    doctors = doctors.order_by('user__last_name', 'user__first_name', 'pk')[:limit]
+    response = JsonResponse({'results': [
+        {
+            'id': doctor.pk,
+            'name': f'Dr. {doctor.user.first_name} {doctor.user.last_name}',
+            'specialization': doctor.specialization,
+            'label': f'Dr. {doctor.user.first_name} {doctor.user.last_name} - {doctor.specialization}',
+        }
+        for doctor in doctors
+    ]})
+    response['Cache-Control'] = 'private, max-age=30'
+    return response
+
+
+@login_required
+def available_doctors(request):
+    """Doctors free at ``?at=<ISO datetime>``, optionally filtered by ``?specialization=``."""
+    at = parse_datetime(request.GET.get('at', ''))
+    if at is None:
+        return JsonResponse({'error': 'Pass "at" as an ISO 8601 datetime.'}, status=400)
+    if timezone.is_naive(at):
+        at = timezone.make_aware(at)
+    doctors = booking.available_doctors(at, specialization=request.GET.get('specialization'))
+    return JsonResponse({
+        'at': at.isoformat(),
+        'doctors': [
+            {
+                'id': doctor.pk,
+                'name': f'Dr. {doctor.user.first_name} {doctor.user.last_name}',
+                'specialization': doctor.specialization,
+            }
+            for doctor in doctors
+        ],
+    })
+
+
+@login_required
+def doctor_free_slots(request, pk):
+    """Next free appointment slots for a doctor as JSON."""
+    doctor = get_object_or_404(Doctor, pk=pk)
+    try:
+        count = min(max(int(request.GET.get('count', 5)), 1), 50)
+    except ValueError:
+        count = 5
+    slots = booking.next_free_slots(doctor, count=count)
+    return JsonResponse({'doctor': doctor.pk, 'slots': [slot.isoformat() for slot in slots]})
+
+
+@login_required
+@no_store
 def appointment_detail(request, pk):
     """View appointment details."""
-    appointment = get_object_or_404(Appointment, pk=pk)
+    appointment = get_object_or_404(Appointment.objects.select_related('patient__user', 'doctor__user'), pk=pk)
     return render(request, 'appointment_detail.html', {'appointment': appointment})
 
 
 @login_required
-@never_cache
+@no_store
 def appointment_cancel(request, pk):
     """Cancel an appointment."""
-    appointment = get_object_or_404(Appointment, pk=pk)
-    
     if request.method == 'POST':
-        appointment.status = 'cancelled'
-        appointment.save()
-        messages.success(request, 'Appointment cancelled successfully!')
+        # One conditional UPDATE: only scheduled appointments can be cancelled,
+        # and concurrent cancels cannot both succeed. QuerySet.update skips
+        # signals, so the counters are moved here.
+        with transaction.atomic():
+            cancelled = Appointment.objects.filter(pk=pk, status='scheduled').update(
+                status='cancelled', updated_at=timezone.now())
+            if cancelled:
+                stats.increment({stats.status_key('scheduled'): -1, stats.status_key('cancelled'): 1})
+        if cancelled:
+            django_messages.success(request, 'Appointment cancelled successfully!')
+        elif Appointment.objects.filter(pk=pk).exists():
+            django_messages.error(request, 'Only scheduled appointments can be cancelled.')
+        else:
+            raise Http404('No Appointment matches the given query.')
         return redirect('core:appointment-list')
     
+    appointment = get_object_or_404(Appointment.objects.select_related('patient__user', 'doctor__user'), pk=pk)
     return render(request, 'appointment_cancel.html', {'appointment': appointment})
 
 
 @login_required
-@never_cache
+@private_conditional()
 def medical_records(request):
     """View medical records."""
     if not request.user.is_authenticated:
@@ -230,7 +433,7 @@ def medical_records(request):
 
 
 @login_required
-@never_cache
+@private_conditional()
 def prescriptions(request):
     """View prescriptions."""
     if not request.user.is_authenticated:
@@ -240,7 +443,7 @@ def prescriptions(request):
 
 
 @login_required
-@never_cache
+@private_conditional()
 def settings_view(request):
     """User settings page."""
     if not request.user.is_authenticated:
@@ -250,7 +453,7 @@ def settings_view(request):
 
 
 @login_required
-@never_cache
+@private_conditional()
 def messages(request):
     """Messages/chat page."""
     if not request.user.is_authenticated:
@@ -260,7 +463,7 @@ def messages(request):
 
 
 @login_required
-@never_cache
+@private_conditional()
 def profile(request):
     """User profile page."""
     if not request.user.is_authenticated:
@@ -268,3 +471,23 @@ def profile(request):
     
     return render(request, 'profile.html', {'user': request.user})
 
+
+
+@no_store
+def performance_metrics(request):
+    """
+    Request metrics of this worker process as JSON, or in the Prometheus text
+    format with ``?format=prometheus``. Admins only; scrapers may instead send
+    ``Authorization: Bearer <PERFORMANCE_METRICS_TOKEN>``.
+    """
+    token = settings.PERFORMANCE_METRICS_TOKEN
+    header = request.headers.get('Authorization', '')
+    if not (token and constant_time_compare(header, f'Bearer {token}')):
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        if request.user.role != User.Role.ADMIN:
+            return redirect('core:dashboard')
+    
+    if request.GET.get('format') == 'prometheus':
+        return HttpResponse(metrics.registry.prometheus(), content_type='text/plain; version=0.0.4')
+    return JsonResponse(metrics.registry.snapshot())
@@ -0,0 +1,56 @@
+"""
+Gunicorn settings for the web process (see Procfile).
+
+* Workers: WEB_CONCURRENCY, or 2 x CPUs + 1 capped at GUNICORN_MAX_WORKERS.
+  CPUs are the ones this process may run on, which inside a container can be
+  fewer than the host has.
+* gthread workers with GUNICORN_THREADS threads each, so a request waiting
+  on the database does not hold up the rest of its worker. Every thread can
+  hold a database connection: the server must allow workers x threads.
+* The app is imported once in the master before forking (preload_app), so
+  workers share Django and the project modules copy-on-write instead of
+  importing them each. gc.freeze() keeps the garbage collector from writing
+  to, and so un-sharing, those objects in the workers. Code changes need a
+  restart rather than a HUP with preloading.
+* Workers are replaced after GUNICORN_MAX_REQUESTS requests, plus up to
+  GUNICORN_MAX_REQUESTS_JITTER more so they do not all restart together,
+  which caps slow memory growth.
+
+benchmarks/startup.py measures boot time and per-worker memory with and
+without these settings.
+"""
+import gc
+import os
+
+try:
+    cpus = len(os.sched_getaffinity(0))
+except AttributeError:  # not on Linux
+    cpus = os.cpu_count() or 1
+
+workers = int(os.environ.get('WEB_CONCURRENCY', min(cpus * 2 + 1, int(os.environ.get('GUNICORN_MAX_WORKERS', 8)))))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True') == 'True'
+
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = timeout
+keepalive = 5
+
+errorlog = '-'
+
+
+def when_ready(server):
+    # After the preload and before the first fork
+    if preload_app:
+        gc.freeze()
+
+
+def pre_fork(server, worker):
+    # Nothing should have connected while importing, but a connection
+    # inherited by several workers would be shared between them
+    if preload_app:
+        from django.db import connections
+        connections.close_all()
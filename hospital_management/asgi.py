@@ -12,5 +12,11 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hospital_management.settings')
+# Async-capable middleware only (static files through ServeStatic), see settings
+os.environ['SERVER_MODE'] = 'asgi'
+# Each ASGI request runs its queries on a thread of its own, so persistent
+# per-thread connections would pile up; close them after every request.
+# Set DB_POOL_MODE=pool (or pgbouncer) to reuse connections instead.
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
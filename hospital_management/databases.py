@@ -0,0 +1,71 @@
+"""
+Database settings built from the environment.
+
+``database_config`` turns a DATABASE_URL into a Django DATABASES entry and,
+for PostgreSQL, applies one of three connection profiles (DB_POOL_MODE):
+
+* ``persistent`` (default): one connection per worker thread, kept for
+  DB_CONN_MAX_AGE seconds and health-checked before reuse.
+* ``pool``: Django's native psycopg 3 connection pool with DB_POOL_MIN_SIZE
+  to DB_POOL_MAX_SIZE connections per process. Needs ``psycopg[pool]``.
+* ``pgbouncer``: short-lived connections to a transaction-pooling PgBouncer,
+  so no server-side cursors or prepared statements, which do not survive
+  a change of server connection between transactions.
+
+Every worker process opens its own connections, so the server must allow
+workers x (pool max size or threads) connections, for the primary and for
+the replica alike.
+"""
+import importlib.util
+
+import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
+
+POOL_MODES = ('persistent', 'pool', 'pgbouncer')
+
+
+def env_int(env, name, default):
+    try:
+        return int(env.get(name, default))
+    except ValueError:
+        raise ImproperlyConfigured(f'{name} must be an integer.') from None
+
+
+def database_config(url, env):
+    mode = env.get('DB_POOL_MODE', 'persistent')
+    if mode not in POOL_MODES:
+        raise ImproperlyConfigured(f'DB_POOL_MODE must be one of {", ".join(POOL_MODES)}, not {mode!r}.')
+    config = dj_database_url.parse(
+        url,
+        conn_max_age=env_int(env, 'DB_CONN_MAX_AGE', 600),
+        conn_health_checks=env.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+    )
+    if config['ENGINE'] != 'django.db.backends.postgresql':
+        return config
+
+    options = config.setdefault('OPTIONS', {})
+    options['connect_timeout'] = env_int(env, 'DB_CONNECT_TIMEOUT', 5)
+    if mode == 'pool':
+        if importlib.util.find_spec('psycopg_pool') is None:
+            raise ImproperlyConfigured('DB_POOL_MODE=pool needs psycopg 3 with its pool: pip install "psycopg[pool]".')
+        # The pool manages connection lifetime; Django must hand connections back after each request
+        config['CONN_MAX_AGE'] = 0
+        config['CONN_HEALTH_CHECKS'] = False
+        options['pool'] = {
+            'min_size': env_int(env, 'DB_POOL_MIN_SIZE', 2),
+            'max_size': env_int(env, 'DB_POOL_MAX_SIZE', 10),
+            # Seconds a request waits for a free connection before failing
+            'timeout': env_int(env, 'DB_POOL_TIMEOUT', 10),
+        }
+    elif mode == 'pgbouncer':
+        config['CONN_MAX_AGE'] = 0
+        config['DISABLE_SERVER_SIDE_CURSORS'] = True
+        if importlib.util.find_spec('psycopg') is not None:
+            options['prepare_threshold'] = None
+
+    # Milliseconds; 0 disables. PgBouncer rejects startup options, so set
+    # statement_timeout on the database role instead in that mode.
+    statement_timeout = env_int(env, 'DB_STATEMENT_TIMEOUT_MS', 30000)
+    if statement_timeout and mode != 'pgbouncer':
+        options['options'] = f'-c statement_timeout={statement_timeout}'
+    return config
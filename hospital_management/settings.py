@@ -12,7 +12,10 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 
 from pathlib import Path
 import os
-import dj_database_url
+import tempfile
+from django.core.exceptions import ImproperlyConfigured
+
+from .databases import database_config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -50,12 +53,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.routers.ReplicaStickinessMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.auth.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -64,7 +69,8 @@ ROOT_URLCONF = 'hospital_management.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that reports render time to core.metrics
+        'BACKEND': 'core.templating.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -73,6 +79,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.fragment_cache',
             ],
         },
     },
@@ -84,13 +91,26 @@ WSGI_APPLICATION = 'hospital_management.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# Connection profile (DB_POOL_MODE, pool sizes, health checks, statement
+# timeout) is read from the environment, see hospital_management.databases.
 DATABASES = {
-    'default': dj_database_url.config(
-        default=f'sqlite:///{BASE_DIR}/db.sqlite3',
-        conn_max_age=600
-    )
+    'default': database_config(os.environ.get('DATABASE_URL', f'sqlite:///{BASE_DIR}/db.sqlite3'), os.environ),
 }
 
+# Optional read replica. The list views, dashboards and streaming exports
+# read from it (core.routers.replica_reads); writes and everything else use
+# the primary.
+if os.environ.get('DATABASE_REPLICA_URL'):
+    DATABASES['replica'] = database_config(os.environ['DATABASE_REPLICA_URL'], os.environ)
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# After a request writes, the browser reads from the primary for this many
+# seconds so it sees its own changes; set above the replica's usual lag.
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 15))
+REPLICA_STICKY_COOKIE = 'hms_primary'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -112,10 +132,88 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 AUTH_USER_MODEL = 'users.User'
+
+# Seconds an authenticated user (and their Doctor/Patient profile) stays in the
+# cache used by core.auth.CachedAuthenticationMiddleware. Saves invalidate the
+# entry immediately; the timeout bounds how long changes made with
+# QuerySet.update or raw SQL (deactivation, role, password) go unnoticed, and
+# staleness across processes when the cache backend is not shared.
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get('AUTH_USER_CACHE_TIMEOUT', '60'))
+
+# Part of every ETag issued by core.http, so browsers revalidate into fresh
+# markup after a deploy. Render exposes the deployed commit as RENDER_GIT_COMMIT.
+HTTP_CACHE_VERSION = os.environ.get('HTTP_CACHE_VERSION', os.environ.get('RENDER_GIT_COMMIT', ''))
+
+# Per-process cache for cached users and list row fragments. LocMemCache culls
+# at MAX_ENTRIES, which must comfortably exceed the rows on a large list page.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', '20000')),
+        },
+    },
+}
+
+# Session storage. SESSION_MODE "db" (the default) reads django_session on
+# every request that touches the session; "cached_db" serves reads from the
+# "sessions" cache and writes through to the table; "cache" keeps sessions in
+# that cache only. SESSION_CACHE_BACKEND "file" (the default) is shared by the
+# workers on one host; "locmem" is private to a process and therefore only
+# safe with a single worker, since a logout in one process would not evict
+# another process's copy. Expired rows are removed by manage.py purge_sessions.
+SESSION_MODE = os.environ.get('SESSION_MODE', 'db')
+if SESSION_MODE not in ('db', 'cached_db', 'cache'):
+    raise ImproperlyConfigured(f'SESSION_MODE must be db, cached_db or cache, not {SESSION_MODE!r}.')
+SESSION_ENGINE = f'core.sessions.{SESSION_MODE}'
+SESSION_CACHE_ALIAS = 'sessions'
+SESSION_CACHE_BACKEND = os.environ.get('SESSION_CACHE_BACKEND', 'file')
+if SESSION_CACHE_BACKEND not in ('file', 'locmem'):
+    raise ImproperlyConfigured(f'SESSION_CACHE_BACKEND must be file or locmem, not {SESSION_CACHE_BACKEND!r}.')
+CACHES['sessions'] = {
+    'BACKEND': {
+        'file': 'django.core.cache.backends.filebased.FileBasedCache',
+        'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    }[SESSION_CACHE_BACKEND],
+    'LOCATION': os.environ.get('SESSION_CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'hms-sessions')),
+    'TIMEOUT': None,  # the session store passes each session's expiry
+    'OPTIONS': {
+        'MAX_ENTRIES': int(os.environ.get('SESSION_CACHE_MAX_ENTRIES', '100000')),
+    },
+}
+
+# Seconds a rendered list row stays in the cache. Row fragments are keyed on
+# the row's pk and updated_at (renaming a user touches the rows showing the
+# name, see core.signals), so edits never serve stale HTML and this only
+# bounds memory use.
+FRAGMENT_CACHE_TIMEOUT = int(os.environ.get('FRAGMENT_CACHE_TIMEOUT', '3600'))
+
+# Per-view request metrics (core.middleware.PerformanceMiddleware), served at
+# /dashboard/metrics/. Queries slower than PERFORMANCE_SLOW_QUERY_MS are logged
+# with their SQL to the core.performance logger.
+PERFORMANCE_METRICS = os.environ.get('PERFORMANCE_METRICS', 'False') == 'True'
+PERFORMANCE_SLOW_QUERY_MS = float(os.environ.get('PERFORMANCE_SLOW_QUERY_MS', '200'))
+PERFORMANCE_METRICS_TOKEN = os.environ.get('PERFORMANCE_METRICS_TOKEN', '')
+
 LOGIN_REDIRECT_URL = '/dashboard/'
 LOGOUT_REDIRECT_URL = '/login/'
 LOGIN_URL = '/login/'
 
+# Django REST Framework - read-only API for integration partners
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.IsAuthenticated',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
 # Crispy Forms - disabled for Render deployment
 # CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 # CRISPY_TEMPLATE_PACK = "bootstrap5"
@@ -144,9 +242,32 @@ STATICFILES_DIRS = [
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# Uploaded files (profile photos and their thumbnails, patient documents)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
+
+# Resumable document uploads (apps.patients.uploads). Part files must be on the
+# same filesystem as MEDIA_ROOT so finished uploads can be moved into place.
+DOCUMENT_UPLOAD_DIR = os.environ.get('DOCUMENT_UPLOAD_DIR', os.path.join(MEDIA_ROOT, 'uploads'))
+DOCUMENT_UPLOAD_CHUNK_SIZE = int(os.environ.get('DOCUMENT_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))
+DOCUMENT_UPLOAD_MAX_SIZE = int(os.environ.get('DOCUMENT_UPLOAD_MAX_SIZE', 1024 * 1024 * 1024))
+# e.g. X-Accel-Redirect with an nginx internal location at DOCUMENT_SENDFILE_PREFIX
+DOCUMENT_SENDFILE_HEADER = os.environ.get('DOCUMENT_SENDFILE_HEADER', '')
+DOCUMENT_SENDFILE_PREFIX = os.environ.get('DOCUMENT_SENDFILE_PREFIX', '/protected-media/')
+
 # WhiteNoise configuration for serving static files
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# hospital_management/asgi.py sets SERVER_MODE=asgi. WhiteNoise's middleware
+# is synchronous, so under ASGI it would make Django run every request's
+# middleware chain and views in a thread; ServeStatic, its async fork, serves
+# the same STATIC_ROOT there instead.
+SERVER_MODE = os.environ.get('SERVER_MODE', 'wsgi')
+if SERVER_MODE == 'asgi':
+    MIDDLEWARE[MIDDLEWARE.index('whitenoise.middleware.WhiteNoiseMiddleware')] = (
+        'servestatic.middleware.ServeStaticMiddleware'
+    )
+
 # CSRF and Session settings for production
 CSRF_COOKIE_SECURE = False  # Set to True in production with HTTPS
 SESSION_COOKIE_SECURE = False  # Set to True in production with HTTPS
@@ -1,11 +1,20 @@
 """
 URL configuration for hospital_management project.
 """
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 from django.contrib.auth import views as auth_views
+from rest_framework.routers import DefaultRouter
+from core import api
 from . import views
 
+router = DefaultRouter()
+router.register('patients', api.PatientViewSet, basename='patient')
+router.register('doctors', api.DoctorViewSet, basename='doctor')
+router.register('appointments', api.AppointmentViewSet, basename='appointment')
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', views.home, name='home'),
@@ -15,5 +24,9 @@ urlpatterns = [
     path('doctor-login/', views.doctor_login, name='doctor-login'),
     path('dashboard/', include('core.urls')),
     path('patients/', include('apps.patients.urls')),
+    path('api/', include(router.urls)),
 ]
 
+# Uploaded media in development; a no-op unless DEBUG is on
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
@@ -5,7 +5,8 @@ from django.contrib import messages
 from django.views.decorators.cache import never_cache
 from django.http import HttpResponseRedirect
 from django.urls import reverse
-from apps.users.models import User
+from core.auth import dashboard_url_name
+from core.http import no_store
 
 
 @never_cache
@@ -13,7 +14,7 @@ def custom_login(request):
     """Custom login view with role-based authentication."""
     # If already authenticated, redirect to dashboard (but first check if we need to clear old session)
     if request.user.is_authenticated:
-        return redirect('core:dashboard')
+        return redirect(dashboard_url_name(request.user) or 'core:dashboard')
     
     if request.method == 'POST':
         username = request.POST.get('username')
@@ -33,12 +34,9 @@ def custom_login(request):
             request.session['user_id'] = user.id
             
             # Redirect based on role
-            if user.role == User.Role.ADMIN:
-                return redirect('core:admin-dashboard')
-            elif user.role == User.Role.DOCTOR:
-                return redirect('core:doctor-dashboard')
-            elif user.role == User.Role.PATIENT:
-                return redirect('core:patient-dashboard')
+            url_name = dashboard_url_name(user)
+            if url_name:
+                return redirect(url_name)
             else:
                 messages.error(request, 'Invalid user role. Please contact administrator.')
                 # Logout if no valid role
@@ -52,9 +50,9 @@ def custom_login(request):
 
 @never_cache
 def home(request):
-    """Home page - redirects to login or dashboard based on auth status."""
+    """Home page - redirects to login or straight to the role dashboard."""
     if request.user.is_authenticated:
-        return redirect('core:dashboard')
+        return redirect(dashboard_url_name(request.user) or 'core:dashboard')
     return redirect('login')
 
 
@@ -116,7 +114,7 @@ def patient_dashboard(request):
     return render(request, 'patient_dashboard.html')
 
 
-@never_cache
+@no_store
 def custom_logout(request):
     """Custom logout view with proper session and cache clearing."""
     from django.contrib.auth import logout as auth_logout
@@ -127,9 +125,8 @@ def custom_logout(request):
     
     # Clear all cookie data
     response = redirect('login')
-    response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-    response['Pragma'] = 'no-cache'
-    response['Expires'] = '0'
+    # Drop the privately cached pages (see core.http) from the browser
+    response['Clear-Site-Data'] = '"cache"'
     
     # Also clear the session cookie explicitly
     response.set_cookie('sessionid', '', expires='Thu, 01 Jan 1970 00:00:00 GMT', path='/')
@@ -7,6 +7,7 @@ document.addEventListener('DOMContentLoaded', function () {
     initAnimations();
     initSearch();
     initNotifications();
+    initTypeahead();
 });
 
 // Sidebar Toggle
@@ -116,6 +117,84 @@ function performSearch(query) {
     // window.location.href = '/search/?q=' + encodeURIComponent(query);
 }
 
+// Typeahead pickers: a search input with data-typeahead-url, the hidden input
+// that receives the chosen id before it and the result list after it
+function initTypeahead() {
+    document.querySelectorAll('[data-typeahead-url]').forEach(input => {
+        const hidden = input.previousElementSibling;
+        const list = input.nextElementSibling;
+        const minLength = parseInt(input.dataset.typeaheadMinLength || '2', 10);
+        let timer = null;
+        let controller = null;
+
+        function close() {
+            list.classList.add('d-none');
+            list.innerHTML = '';
+        }
+
+        function choose(result) {
+            hidden.value = result.id;
+            input.value = result.label;
+            input.setCustomValidity('');
+            close();
+        }
+
+        function lookup() {
+            const query = input.value.trim();
+            if (query.length < minLength) {
+                close();
+                return;
+            }
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+            const url = input.dataset.typeaheadUrl + '?q=' + encodeURIComponent(query);
+            fetch(url, {signal: controller.signal, headers: {'Accept': 'application/json'}})
+                .then(response => response.json())
+                .then(data => {
+                    list.innerHTML = '';
+                    data.results.forEach(result => {
+                        const item = document.createElement('button');
+                        item.type = 'button';
+                        item.className = 'list-group-item list-group-item-action';
+                        item.textContent = result.label;
+                        item.addEventListener('mousedown', e => {
+                            e.preventDefault();
+                            choose(result);
+                        });
+                        list.appendChild(item);
+                    });
+                    list.classList.toggle('d-none', !data.results.length);
+                })
+                .catch(() => {});
+        }
+
+        input.addEventListener('input', () => {
+            // Typing invalidates the previous choice until a result is picked
+            hidden.value = '';
+            input.setCustomValidity('Choose an entry from the list.');
+            clearTimeout(timer);
+            timer = setTimeout(lookup, 200);
+        });
+        input.addEventListener('focus', () => {
+            if (!hidden.value) {
+                lookup();
+            }
+        });
+        input.addEventListener('blur', close);
+        input.addEventListener('keydown', e => {
+            const first = list.querySelector('button');
+            if (e.key === 'Enter' && first && !list.classList.contains('d-none')) {
+                e.preventDefault();
+                first.dispatchEvent(new MouseEvent('mousedown'));
+            } else if (e.key === 'Escape') {
+                close();
+            }
+        });
+    });
+}
+
 // Notifications
 function initNotifications() {
     // Mark notifications as read